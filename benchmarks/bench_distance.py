@@ -0,0 +1,64 @@
+"""Benchmark distance engines from many points to the reference locations.
+
+Run from the repository root: PYTHONPATH=. python benchmarks/bench_distance.py
+"""
+import random
+import timeit
+
+from geopy import distance
+
+from fixture_api import load_fixture
+from pyipma import distance as engine
+from pyipma.auxiliar import Districts, Forecast_Locations
+from pyipma.rcm import RCM_day
+
+POINTS = 20
+
+
+def main():
+    coordinates = [
+        d.coordinates
+        for d in Forecast_Locations(None)._data_to_obj_list(
+            load_fixture("locations.json")
+        )
+    ]
+    coordinates += [
+        d.coordinates
+        for d in Districts(None)._data_to_obj_list(
+            load_fixture("distrits-islands.json")
+        )
+    ]
+    coordinates += [
+        d.coordinates
+        for d in RCM_day(None)._data_to_obj_list(load_fixture("rcm-d0.json"))
+    ]
+    rnd = random.Random(0)
+    points = [(rnd.uniform(37, 42), rnd.uniform(-9.5, -6.5)) for _ in range(POINTS)]
+
+    def geopy_geodesic():
+        for point in points:
+            [distance.distance(point, c).km for c in coordinates]
+
+    def geopy_great_circle():
+        for point in points:
+            [distance.great_circle(point, c).km for c in coordinates]
+
+    def vectorized():
+        for point in points:
+            engine.haversine(point, coordinates)
+
+    def matrix():
+        engine.haversine_matrix(points, coordinates)
+
+    print(f"{POINTS} points x {len(coordinates)} coordinates")
+    for name, func in [
+        ("geopy geodesic", geopy_geodesic),
+        ("geopy great_circle", geopy_great_circle),
+        ("haversine", vectorized),
+        ("haversine_matrix", matrix),
+    ]:
+        print(f"{name:19}: {timeit.timeit(func, number=1) * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
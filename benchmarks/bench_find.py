@@ -0,0 +1,44 @@
+"""Benchmark location lookups while parsing an aggregate forecast.
+
+Run from the repository root: PYTHONPATH=. python benchmarks/bench_find.py
+"""
+import asyncio
+import timeit
+
+from fixture_api import FixtureAPI, load_fixture
+from pyipma.auxiliar import Forecast_Locations
+from pyipma.forecast import Forecast_days
+
+ROUNDS = 200
+
+
+def main():
+    rows = load_fixture("1010500.json")
+    locations = Forecast_Locations(None)._data_to_obj_list(
+        load_fixture("locations.json")
+    )
+    by_key = {l.globalIdLocal: l for l in locations}
+
+    def scan():
+        for r in rows:
+            [l for l in locations if l.globalIdLocal == r["globalIdLocal"]][0]
+
+    def index():
+        for r in rows:
+            by_key[r["globalIdLocal"]]
+
+    print(f"{len(rows)} rows x {len(locations)} locations, {ROUNDS} rounds")
+    print(f"list scan  : {timeit.timeit(scan, number=ROUNDS):.4f}s")
+    print(f"dict index : {timeit.timeit(index, number=ROUNDS):.4f}s")
+
+    forecast_days = Forecast_days(FixtureAPI())
+    loop = asyncio.new_event_loop()
+    elapsed = timeit.timeit(
+        lambda: loop.run_until_complete(forecast_days.get(1010500, 1)),
+        number=ROUNDS,
+    )
+    print(f"Forecast_days.get: {elapsed / ROUNDS * 1000:.3f}ms per call")
+
+
+if __name__ == "__main__":
+    main()
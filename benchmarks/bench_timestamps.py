@@ -0,0 +1,46 @@
+"""Benchmark timestamp decoding on the bundled fixtures.
+
+Run from the repository root: PYTHONPATH=. python benchmarks/bench_timestamps.py
+"""
+import datetime
+import timeit
+
+from fixture_api import load_fixture
+from pyipma.timestamps import parse_datetime
+
+ROUNDS = 100
+
+
+def main():
+    forecasts = load_fixture("1010500.json")
+    values = [
+        (r[key], "%Y-%m-%dT%H:%M:%S")
+        for r in forecasts
+        for key in ("dataPrev", "dataUpdate")
+    ]
+    values += [(t, "%Y-%m-%dT%H:%M") for t in load_fixture("observations.json")]
+    values += [(d["data"], "%Y-%m-%d") for d in load_fixture("uv.json")]
+
+    def strptime():
+        for value, fmt in values:
+            datetime.datetime.strptime(value, fmt)
+
+    def fromisoformat():
+        for value, _ in values:
+            datetime.datetime.fromisoformat(value)
+
+    def memoized():
+        for value, _ in values:
+            parse_datetime(value)
+
+    print(f"{len(values)} timestamps, {ROUNDS} rounds")
+    for name, func in [
+        ("strptime", strptime),
+        ("fromisoformat", fromisoformat),
+        ("parse_datetime", memoized),
+    ]:
+        print(f"{name:15}: {timeit.timeit(func, number=ROUNDS):.4f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""IPMA_API serving the bundled fixtures, for offline benchmarks."""
+import json
+import os
+
+from pyipma.api import IPMA_API
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "..", "fixtures")
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name)) as fixture:
+        return json.load(fixture)
+
+
+class FixtureAPI(IPMA_API):
+    """Answers every request with the fixture named after the url."""
+
+    def __init__(self):
+        super().__init__(None, cache=False)
+        self.fixtures = {}
+
+    async def retrieve(self, url, **kwargs):
+        name = url.rsplit("/", 1)[-1]
+        if name not in self.fixtures:
+            self.fixtures[name] = load_fixture(name)
+        return self.fixtures[name]
@@ -1,9 +1,26 @@
 """API to IPMA."""
 import ast
+import asyncio
 import logging
-import json
+from urllib.parse import urlsplit
+
 import aiohttp
 
+from . import IPMAException
+from .cache import ResponseCache
+from .decoders import default_decoder
+from .ratelimit import RateLimiter, current_priority
+from .registry import Registry
+from .resilience import (
+    ENDPOINT_RETRIES,
+    NO_RETRY,
+    APIError,
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryPolicy,
+    retry_policy,
+)
+
 LOGGER = logging.getLogger(__name__)
 LOGGER.setLevel(logging.DEBUG)
 
@@ -11,25 +28,301 @@ LOGGER.setLevel(logging.DEBUG)
 class IPMA_API:  # pylint: disable=invalid-name
     """Interfaces to http://api.ipma.pt service."""
 
-    def __init__(self, websession):
-        """Initializer API session."""
+    def __init__(
+        self,
+        websession,
+        cache=True,
+        decoder=None,
+        retry=True,
+        breaker=True,
+        stale_while_revalidate=0,
+        stale_if_error=0,
+        rate_limit=None,
+    ):
+        """Initializer API session.
+
+        cache: True for a private ResponseCache, False to disable caching or a
+        ResponseCache instance to share between IPMA_API objects.
+        decoder: PayloadDecoder for JSON bodies, the fastest available if None.
+        retry: True for the ENDPOINT_RETRIES policies, False for no retries, a
+        RetryPolicy for every endpoint or a {url fragment: RetryPolicy} dict.
+        breaker: True for a CircuitBreaker per host with default thresholds,
+        False to disable, or a function returning a new CircuitBreaker.
+        stale_while_revalidate: seconds an expired payload is still served
+        while it is refreshed in the background.
+        stale_if_error: seconds an expired payload is still served when it
+        cannot be refreshed.
+        rate_limit: requests per second, or a RateLimiter instance to share
+        between IPMA_API objects. None to issue requests right away.
+        """
         self.websession = websession
+        self.decoder = decoder or default_decoder()
+        if cache is True:
+            cache = ResponseCache()
+        self.cache = cache if cache is not False else None
+        if retry is True:
+            retry = ENDPOINT_RETRIES
+        elif retry is False:
+            retry = NO_RETRY
+        self.retry = retry
+        if breaker is True:
+            breaker = CircuitBreaker
+        self._new_breaker = breaker or None
+        self.breakers = {}
+        self.stale_while_revalidate = stale_while_revalidate
+        self.stale_if_error = stale_if_error
+        if rate_limit is not None and not isinstance(rate_limit, RateLimiter):
+            rate_limit = RateLimiter(rate_limit)
+        self.rate_limiter = rate_limit
+        self._inflight = {}
+        self._levels = {}  # priority of the shared downloads
+        self.registry = Registry(self)
+        self.connection_stats = {"created": 0, "reused": 0}
+        self._session_options = None
+
+    @classmethod
+    def create(
+        cls,
+        limit_per_host=4,
+        keepalive_timeout=60,
+        ttl_dns_cache=600,
+        connect_timeout=10,
+        read_timeout=30,
+        **kwargs,
+    ):
+        """IPMA_API owning a ClientSession tuned for api.ipma.pt.
+
+        Use as `async with IPMA_API.create() as api:`, the session is opened on
+        enter and closed on exit. kwargs are passed to IPMA_API.
+        """
+        api = cls(None, **kwargs)
+        api._session_options = {
+            "limit_per_host": limit_per_host,
+            "keepalive_timeout": keepalive_timeout,
+            "ttl_dns_cache": ttl_dns_cache,
+            "timeout": aiohttp.ClientTimeout(
+                sock_connect=connect_timeout, sock_read=read_timeout
+            ),
+        }
+        return api
+
+    async def __aenter__(self):
+        if self._session_options is not None and self.websession is None:
+            options = self._session_options
+            trace_config = aiohttp.TraceConfig()
+            trace_config.on_connection_create_end.append(self._on_connection_created)
+            trace_config.on_connection_reuseconn.append(self._on_connection_reused)
+            self.websession = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit_per_host=options["limit_per_host"],
+                    keepalive_timeout=options["keepalive_timeout"],
+                    ttl_dns_cache=options["ttl_dns_cache"],
+                ),
+                timeout=options["timeout"],
+                headers={"Accept-Encoding": "gzip, deflate"},
+                trace_configs=[trace_config],
+            )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """Close the session if it was created by IPMA_API.create()."""
+        if self._session_options is not None and self.websession is not None:
+            await self.websession.close()
+            self.websession = None
+
+    async def _on_connection_created(self, session, context, params):
+        self.connection_stats["created"] += 1
+
+    async def _on_connection_reused(self, session, context, params):
+        self.connection_stats["reused"] += 1
 
     async def retrieve(self, url, **kwargs):
-        """Issue API requests."""
+        """Issue API requests.
+
+        Concurrent requests for the same url share a single download.
+        Transient failures are retried, see IPMA_API.__init__. Returns None
+        when the API cannot be reached or answers garbage, raises APIError
+        for unexpected statuses and CircuitOpenError while the host is down.
+        """
+        entry = None
+        if self.cache is not None and not kwargs:
+            entry = self.cache.get(url)
+            if entry is not None and entry.fresh:
+                self.cache.hits += 1
+                return entry.payload
+
+        if kwargs:
+            return await self._fetch(url, entry, **kwargs)
+
+        task = self._shared_fetch(url, entry)
+
+        if entry is not None and entry.staleness <= self.stale_while_revalidate:
+            LOGGER.debug("Serving %s while it is refreshed", url)
+            self.cache.hits += 1
+            task.add_done_callback(_consume)
+            return entry.payload
+
+        # shield so a cancelled caller does not cancel the shared download
+        return await asyncio.shield(task)
+
+    async def revalidate(self, url):
+        """Retrieve url from the API even if its cached payload is fresh.
+
+        Cached payloads are revalidated with a conditional request, so an
+        unchanged payload is neither downloaded nor decoded again.
+        """
+        entry = self.cache.get(url) if self.cache is not None else None
+        return await asyncio.shield(self._shared_fetch(url, entry))
+
+    def _shared_fetch(self, url, entry):
+        """Download of url shared by concurrent callers.
+
+        The download is issued at the priority of its most urgent caller.
+        """
+        level = current_priority()
+        task = self._inflight.get(url)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(url, entry))
+            self._inflight[url] = task
+            self._levels[url] = level
+
+            def done(_):
+                self._inflight.pop(url, None)
+                self._levels.pop(url, None)
+
+            task.add_done_callback(done)
+        elif level < self._levels[url]:
+            self._levels[url] = level
+            if self.rate_limiter is not None:
+                self.rate_limiter.promote(url, level)
+        return task
+
+    def _retry_policy(self, url):
+        if isinstance(self.retry, RetryPolicy):
+            return self.retry
+        return retry_policy(url, self.retry)
+
+    def _breaker(self, url):
+        if self._new_breaker is None:
+            return None
+        host = urlsplit(url).hostname
+        if host not in self.breakers:
+            self.breakers[host] = self._new_breaker()
+        return self.breakers[host]
+
+    def _stale(self, url, entry, err):
+        """Payload of entry if it may be served instead of raising err."""
+        if entry is not None and entry.staleness <= self.stale_if_error:
+            LOGGER.warning("Serving stale %s: %s", url, err)
+            return entry.payload
+        return None
+
+    async def _fetch(self, url, entry=None, **kwargs):
+        """Download url with retries, revalidating entry if given."""
+        policy = self._retry_policy(url)
+        breaker = self._breaker(url)
+
+        for attempt in range(policy.attempts):
+            if breaker is not None and not breaker.allow():
+                err = CircuitOpenError(
+                    f"Not requesting {url} for {breaker.retry_after:.0f} seconds"
+                )
+                stale = self._stale(url, entry, err)
+                if stale is None:
+                    raise err
+                return stale
+
+            try:
+                payload = await self._request(url, entry, **kwargs)
+            except APIError as err:
+                transient = policy.retries(err.status)
+                failure = err
+            except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+                transient = True
+                failure = err
+            except ValueError as err:  # JSON decoding errors
+                LOGGER.error(err)
+                return self._stale(url, entry, err)
+            else:
+                if breaker is not None:
+                    breaker.success()
+                return payload
+
+            if breaker is not None:
+                if transient:
+                    breaker.failure()
+                else:
+                    breaker.success()
+            if not transient or attempt + 1 == policy.attempts:
+                break
+            delay = policy.delay(attempt)
+            LOGGER.debug("Retrying %s in %.1fs: %s", url, delay, failure)
+            await asyncio.sleep(delay)
+
+        stale = self._stale(url, entry, failure)
+        if stale is not None:
+            return stale
+        if isinstance(failure, APIError):
+            raise failure
+        LOGGER.error(failure)
+        return None
+
+    async def _request(self, url, entry=None, **kwargs):
+        """Download url once, revalidating entry if given."""
+        headers = {"Referer": "http://www.ipma.pt"}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+
+        if self.rate_limiter is not None:
+            level = None if kwargs else self._levels.get(url)
+            await self.rate_limiter.acquire(url, level)
+        async with self.websession.request(
+            "GET", url, headers=headers, **kwargs
+        ) as res:
+            if res.status == 304 and entry is not None:
+                LOGGER.debug("%s not modified", url)
+                return self.cache.revalidated(url, entry).payload
+            if res.status != 200:
+                raise APIError(url, res.status)
+            body = await res.read()
+            if res.content_type == "application/json":
+                payload = self.decoder.decode(body, url)
+            else:
+                payload = body.decode(res.get_encoding())
+            if self.cache is not None and not kwargs:
+                self.cache.misses += 1
+                self.cache.store(
+                    url,
+                    payload,
+                    res.headers.get("ETag"),
+                    res.headers.get("Last-Modified"),
+                )
+            return payload
+
+    async def stream(self, url, chunk_size=65536):
+        """Issue an API request, yielding the body in chunks as it arrives.
+
+        Streamed responses bypass the cache.
+        """
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire(url)
         try:
             async with self.websession.request(
-                "GET", url, headers={"Referer": "http://www.ipma.pt"}, **kwargs
+                "GET", url, headers={"Referer": "http://www.ipma.pt"}
             ) as res:
                 if res.status != 200:
-                    raise Exception("Could not retrieve information from API")
-                if res.content_type == "application/json":
-                    return await res.json()
-                return await res.text()
+                    raise APIError(url, res.status)
+                async for chunk in res.content.iter_chunked(chunk_size):
+                    yield chunk
         except aiohttp.ClientError as err:
             LOGGER.error(err)
-        except json.decoder.JSONDecodeError as err:
-            LOGGER.error(err)
+            raise IPMAException(f"Could not stream {url}") from err
 
     @classmethod
     def _to_number(cls, string):
@@ -38,3 +331,9 @@ class IPMA_API:  # pylint: disable=invalid-name
         if isinstance(num, (int, float)):
             return num
         return string
+
+
+def _consume(task):
+    """Retrieve the outcome of a background refresh nobody awaits."""
+    if not task.cancelled() and task.exception() is not None:
+        LOGGER.warning("Background refresh failed: %s", task.exception())
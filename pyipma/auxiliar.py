@@ -1,47 +1,122 @@
 import logging
+import time
 from dataclasses import dataclass
 
-from geopy import distance
-
 from pyipma.api import IPMA_API
 from pyipma import IPMAException
+from pyipma.distance import HAVERSINE
+from pyipma.spatial import SpatialIndex
 
 LOGGER = logging.getLogger(__name__)  # pylint: disable=invalid-name
 
 class AuxiliarParser:
-    def __init__(self, api: IPMA_API, type="location"):
+    key = None  # attribute indexed in by_key
+
+    def __init__(self, api: IPMA_API, type="location", accuracy=HAVERSINE):
         _TYPES = {"location": self.get_location, "type": self.get_type}
+        self.type = type
+        self.accuracy = accuracy
         self.data = None
+        self.index = None
+        self.by_key = {}
         self.api = api
         self.get = _TYPES[type]
+        self.loaded = None  # time.monotonic() of the last load
+        self._expired = False
+        self._raw = None
 
-    async def get_type(self, id):
-        if not self.data:
-            raw = await self.api.retrieve(url=self.endpoint)
+    def reset(self):
+        """Forget parsed data so it is retrieved again on next use."""
+        self.data = None
+        self.index = None
+        self.by_key = {}
+        self.loaded = None
+        self._expired = False
+        self._raw = None
+
+    def expire(self):
+        """Retrieve the data again on next use, keeping it if that fails."""
+        self._expired = True
+
+    @property
+    def expired(self):
+        """Whether the data is expired or older than the registry refresh interval."""
+        if self._expired:
+            return True
+        if self.loaded is None or self.api is None:
+            return False
+        return time.monotonic() - self.loaded > self.api.registry.refresh_interval
+
+    async def load(self):
+        """Retrieve and index the endpoint data, again once expired.
+
+        Expired data is kept if it cannot be retrieved again.
+        """
+        if self.data and not self.expired:
+            return self.data
+
+        raw = await self.api.retrieve(url=self.endpoint)
+        if raw is None:
+            if self.data:
+                LOGGER.warning("Could not refresh %s", self.endpoint)
+                return self.data
+            raise IPMAException(f"Could not retrieve {self.endpoint}")
+
+        self.loaded = time.monotonic()
+        self._expired = False
+        if raw is self._raw:  # unchanged
+            return self.data
+
+        data = self._data_to_obj_list(raw)
+        if self.type == "type":
+            self.data = sorted(data, key=lambda d: abs(d.id))
+        else:
+            self.data = data
+            self.index = SpatialIndex(self.data, self.accuracy)
+        if self.key:
+            self.by_key = {getattr(d, self.key): d for d in self.data}
+        self._raw = raw
 
-            self.data = sorted(self._data_to_obj_list(raw), key=lambda d: abs(d.id))
+        return self.data
 
+    async def get_type(self, id):
+        await self.load()
+        return self.type_of(id)
+
+    def type_of(self, id):
+        """Type for id, data must be loaded."""
         if id >= 0:
             return self.data[id]
         else:
             return self.data[-1]  # -99 is the last
 
-    async def get_location(self, lon, lat):
-        if not self.data:
-            raw = await self.api.retrieve(url=self.endpoint)
+    async def get_location(self, lon, lat, k=None):
+        """Locations sorted by distance to (lon, lat), the k closest if given."""
+        await self.load()
 
-            if raw is None:
-                raise IPMAException(f"Could not retrieve location for {lon}, {lat}")
+        if (lon, lat) == (None, None):
+            return self.data
 
-            self.data = self._data_to_obj_list(raw)
+        return self.index.nearest(lon, lat, len(self.data) if k is None else k)
 
-            if (lon, lat) != (None, None):
-                self.data = sorted(
-                    self.data,
-                    key=lambda d: distance.distance((lon, lat), d.coordinates).km,
-                )
+    async def find(self, key):
+        """Entry identified by key."""
+        await self.load()
+        return self.by_key[key]
 
-        return self.data
+    async def find_many(self, keys):
+        """Entries identified by keys, in the same order."""
+        await self.load()
+        return [self.by_key[key] for key in keys]
+
+    async def nearest(self, lon, lat, k=1):
+        """The k locations closest to (lon, lat)."""
+        return await self.get_location(lon, lat, k)
+
+    async def within(self, lon, lat, radius_km):
+        """Locations no further than radius_km from (lon, lat)."""
+        await self.get_location(None, None)
+        return self.index.within(lon, lat, radius_km)
 
 
 @dataclass
@@ -59,8 +134,10 @@ class District:
 
 
 class Districts(AuxiliarParser):
-    def __init__(self, api: IPMA_API):
-        super().__init__(api)
+    key = "globalIdLocal"
+
+    def __init__(self, api: IPMA_API, accuracy=HAVERSINE):
+        super().__init__(api, accuracy=accuracy)
         self.endpoint = "https://api.ipma.pt/open-data/distrits-islands.json"
 
     def _data_to_obj_list(self, raw):
@@ -93,8 +170,10 @@ class Forecast_Location:
 
 
 class Forecast_Locations(AuxiliarParser):
-    def __init__(self, api: IPMA_API):
-        super().__init__(api)
+    key = "globalIdLocal"
+
+    def __init__(self, api: IPMA_API, accuracy=HAVERSINE):
+        super().__init__(api, accuracy=accuracy)
         self.endpoint = "http://api.ipma.pt/public-data/forecast/locations.json"
 
     def _data_to_obj_list(self, raw):
@@ -111,11 +190,6 @@ class Forecast_Locations(AuxiliarParser):
             for d in raw
         ]
 
-    async def find(self, globalIdLocal):
-        if self.data is None:
-            await self.get(None, None)
-        return [l for l in self.data if l.globalIdLocal == globalIdLocal][0]
-
 
 @dataclass
 class Sea_Location:
@@ -131,8 +205,10 @@ class Sea_Location:
 
 
 class Sea_Locations(AuxiliarParser):
-    def __init__(self, api: IPMA_API):
-        super().__init__(api)
+    key = "globalIdLocal"
+
+    def __init__(self, api: IPMA_API, accuracy=HAVERSINE):
+        super().__init__(api, accuracy=accuracy)
         self.endpoint = "https://api.ipma.pt/open-data/sea-locations.json"
 
     def _data_to_obj_list(self, raw):
@@ -148,11 +224,6 @@ class Sea_Locations(AuxiliarParser):
             for d in raw
         ]
 
-    async def find(self, globalIdLocal):
-        if self.data is None:
-            await self.get(None, None)
-        return [l for l in self.data if l.globalIdLocal == globalIdLocal][0]
-
 
 @dataclass
 class Station:
@@ -165,8 +236,10 @@ class Station:
 
 
 class Stations(AuxiliarParser):
-    def __init__(self, api: IPMA_API):
-        super().__init__(api)
+    key = "idEstacao"
+
+    def __init__(self, api: IPMA_API, accuracy=HAVERSINE):
+        super().__init__(api, accuracy=accuracy)
         self.endpoint = "https://api.ipma.pt/open-data/observation/meteorology/stations/stations.json"
 
     def _data_to_obj_list(self, raw):
@@ -0,0 +1,119 @@
+"""Response cache for IPMA API payloads."""
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Optional
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_TTL = 300  # seconds
+
+# Time to live (seconds) per endpoint, first matching URL fragment wins.
+ENDPOINT_TTLS = {
+    "observation/meteorology/stations/observations.json": 600,
+    "forecast/warnings/warnings_www.json": 300,
+    "forecast/meteorology/uv/uv.json": 3600,
+    "forecast/meteorology/rcm/": 3600,
+    "forecast/aggregate/": 1800,
+    "forecast/oceanography/daily/": 3600,
+    "forecast/locations.json": 86400,
+    "sea-locations.json": 86400,
+    "stations/stations.json": 86400,
+    "distrits-islands.json": 86400,
+    "-classe.json": 86400,
+}
+
+
+@dataclass
+class CacheEntry:
+    """A cached payload and the validators needed to revalidate it."""
+
+    payload: Any
+    expires: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    @property
+    def fresh(self):
+        """Whether the entry can be served without contacting the API."""
+        return time.monotonic() < self.expires
+
+    @property
+    def staleness(self):
+        """Seconds since the entry expired, 0 while fresh."""
+        return max(0.0, time.monotonic() - self.expires)
+
+
+class ResponseCache:
+    """Size bounded LRU cache of decoded API responses."""
+
+    def __init__(self, max_entries=64, ttls=None, default_ttl=DEFAULT_TTL):
+        self.max_entries = max_entries
+        self.ttls = ENDPOINT_TTLS if ttls is None else ttls
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def ttl(self, url):
+        """Time to live of responses from url."""
+        for fragment, ttl in self.ttls.items():
+            if fragment in url:
+                return ttl
+        return self.default_ttl
+
+    def get(self, url) -> Optional[CacheEntry]:
+        """Entry for url, fresh or not."""
+        entry = self._entries.get(url)
+        if entry is not None:
+            self._entries.move_to_end(url)
+        return entry
+
+    def store(self, url, payload, etag=None, last_modified=None):
+        """Cache a freshly downloaded payload."""
+        expires = time.monotonic() + self.ttl(url)
+        self._put(url, CacheEntry(payload, expires, etag, last_modified))
+
+    def revalidated(self, url, entry):
+        """Extend the life of entry, confirmed unchanged (HTTP 304).
+
+        entry is stored again if it was evicted while being revalidated.
+        """
+        entry.expires = time.monotonic() + self.ttl(url)
+        self.revalidations += 1
+        self._put(url, entry)
+        return entry
+
+    def _put(self, url, entry):
+        if self.max_entries <= 0:
+            return
+        self._entries[url] = entry
+        self._entries.move_to_end(url)
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            self.evictions += 1
+            LOGGER.debug("Evicted %s from cache", evicted)
+
+    def invalidate(self, url=None):
+        """Drop url from the cache, or everything if no url is given."""
+        if url is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(url, None)
+
+    def stats(self):
+        """Cache counters."""
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidations": self.revalidations,
+            "evictions": self.evictions,
+        }
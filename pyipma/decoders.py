@@ -0,0 +1,115 @@
+"""Decoders of API response bodies."""
+import json
+import logging
+from typing import Optional, TypedDict, Union
+
+try:
+    import orjson
+except ImportError:  # orjson is optional
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # msgspec is optional
+    msgspec = None
+
+LOGGER = logging.getLogger(__name__)
+
+Number = Union[str, float, None]  # IPMA sends most numbers as strings
+
+
+class ForecastRow(TypedDict, total=False):
+    """Row of forecast/aggregate/{globalIdLocal}.json."""
+
+    tMed: Number
+    tMin: Number
+    tMax: Number
+    ffVento: Number
+    idFfxVento: Optional[int]
+    dataUpdate: str
+    iUv: Number
+    intervaloHora: Optional[str]
+    idTipoTempo: int
+    hR: Number
+    globalIdLocal: int
+    probabilidadePrecipita: Number
+    idPeriodo: int
+    dataPrev: str
+    ddVento: str
+    utci: Number
+
+
+class ObservationRecord(TypedDict, total=False):
+    """Record of a station in observations.json."""
+
+    intensidadeVentoKM: Optional[float]
+    temperatura: Optional[float]
+    radiacao: Optional[float]
+    idDireccVento: Optional[int]
+    precAcumulada: Optional[float]
+    intensidadeVento: Optional[float]
+    humidade: Optional[float]
+    pressao: Optional[float]
+
+
+# Schemas of the payloads decoded by TypedPayloadDecoder, by URL fragment.
+SCHEMAS = {
+    "forecast/aggregate/": list[ForecastRow],
+    "observation/meteorology/stations/observations.json": dict[
+        str, dict[str, Optional[ObservationRecord]]
+    ],
+}
+
+
+def default_loads():
+    """Fastest available JSON loads function."""
+    if orjson is not None:
+        return orjson.loads
+    if msgspec is not None:
+        return msgspec.json.decode
+    return json.loads
+
+
+class PayloadDecoder:
+    """Decodes JSON response bodies with a configurable loads function."""
+
+    def __init__(self, loads=None):
+        self.loads = loads or default_loads()
+
+    def decode(self, body: bytes, url: str):
+        """Decode the body of the response to url."""
+        return self.loads(body)
+
+
+class TypedPayloadDecoder(PayloadDecoder):
+    """Decodes forecast and observation payloads straight into their schemas.
+
+    Fields outside the schema are dropped while decoding. Payloads that do not
+    match the schema are decoded as plain JSON.
+    """
+
+    def __init__(self, loads=None, schemas=None):
+        if msgspec is None:
+            raise ImportError("TypedPayloadDecoder requires msgspec")
+        super().__init__(loads)
+        self._decoders = {
+            fragment: msgspec.json.Decoder(schema)
+            for fragment, schema in (SCHEMAS if schemas is None else schemas).items()
+        }
+
+    def decode(self, body: bytes, url: str):
+        for fragment, decoder in self._decoders.items():
+            if fragment in url:
+                try:
+                    return decoder.decode(body)
+                except msgspec.ValidationError as err:
+                    LOGGER.debug("%s does not match its schema: %s", url, err)
+                break
+        return self.loads(body)
+
+
+def default_decoder():
+    """Typed decoder when msgspec is installed, plain JSON otherwise."""
+    if msgspec is not None:
+        return TypedPayloadDecoder()
+    return PayloadDecoder()
@@ -0,0 +1,78 @@
+"""Distances (km) between (lat, lon) coordinates."""
+import math
+
+from geopy import distance
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, pure Python is used without it
+    np = None
+
+EARTH_RADIUS_KM = 6371.0088
+
+HAVERSINE = "haversine"  # great circle on a sphere, fast
+GEODESIC = "geodesic"  # WGS-84 ellipsoid through geopy, exact but slow
+ACCURACIES = (HAVERSINE, GEODESIC)
+
+# Largest relative difference between HAVERSINE and GEODESIC distances,
+# used to widen searches before reranking by GEODESIC.
+SPHERE_ERROR = 0.01
+
+
+def haversine(point, coordinates):
+    """Great circle distances from point to each of coordinates.
+
+    Vectorized with numpy when available, returns an array then, a list
+    otherwise.
+    """
+    lat, lon = point
+    if np is not None:
+        coords = np.radians(np.asarray(coordinates, dtype=float).reshape(-1, 2))
+        lat, lon = math.radians(lat), math.radians(lon)
+        a = (
+            np.sin((coords[:, 0] - lat) / 2) ** 2
+            + math.cos(lat)
+            * np.cos(coords[:, 0])
+            * np.sin((coords[:, 1] - lon) / 2) ** 2
+        )
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    lat, lon = math.radians(lat), math.radians(lon)
+    cos_lat = math.cos(lat)
+    result = []
+    for c_lat, c_lon in coordinates:
+        c_lat, c_lon = math.radians(c_lat), math.radians(c_lon)
+        a = (
+            math.sin((c_lat - lat) / 2) ** 2
+            + cos_lat * math.cos(c_lat) * math.sin((c_lon - lon) / 2) ** 2
+        )
+        result.append(2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0))))
+    return result
+
+
+def haversine_matrix(points, coordinates):
+    """Great circle distances, one row per point, one column per coordinate."""
+    if np is None:
+        return [haversine(point, coordinates) for point in points]
+
+    points = np.radians(np.asarray(points, dtype=float).reshape(-1, 2))[:, None, :]
+    coords = np.radians(np.asarray(coordinates, dtype=float).reshape(-1, 2))[None]
+    a = (
+        np.sin((coords[..., 0] - points[..., 0]) / 2) ** 2
+        + np.cos(points[..., 0])
+        * np.cos(coords[..., 0])
+        * np.sin((coords[..., 1] - points[..., 1]) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def geodesic(point, coordinates):
+    """Geodesic distances from point to each of coordinates."""
+    return [distance.distance(point, c).km for c in coordinates]
+
+
+def distances(point, coordinates, accuracy=HAVERSINE):
+    """Distances from point to each of coordinates with the given accuracy."""
+    if accuracy == GEODESIC:
+        return geodesic(point, coordinates)
+    return haversine(point, coordinates)
@@ -1,6 +1,9 @@
 """Representation of a Weather Forecast from IPMA."""
+import asyncio
 import datetime
 import logging
+import sys
+from collections import OrderedDict
 from dataclasses import dataclass
 from datetime import timedelta
 from enum import Enum
@@ -9,6 +12,9 @@ from typing import Optional
 
 from .api import IPMA_API
 from .auxiliar import Forecast_Location, Forecast_Locations, Weather_Type, Weather_Types
+from .ratelimit import BULK, default_priority
+from .schema import Decoder, Field, optional_float, required
+from .timestamps import parse_datetime, parse_utc_datetime
 
 LOGGER = logging.getLogger(__name__)
 
@@ -21,7 +27,7 @@ class TipoTemperatura(Enum):
     MAX = "tMax"
 
 
-@dataclass
+@dataclass(slots=True)
 class Forecast:
     """Represents a Weather Forecast."""
 
@@ -127,69 +133,143 @@ class Forecast:
             {self.temperature}°C, {self.humidity}%, {self.weather_type_description}"
 
 
+FORECAST_DECODER = Decoder(
+    Forecast,
+    [
+        optional_float("tMed"),
+        optional_float("tMin"),
+        optional_float("ffVento"),
+        Field("idFfxVento"),
+        required("dataUpdate", type=parse_datetime),
+        optional_float("tMax"),
+        optional_float("iUv"),
+        Field("intervaloHora", type=sys.intern),
+        required("idTipoTempo", type="weather_type"),
+        optional_float("hR"),
+        required("location", "globalIdLocal", "location"),
+        optional_float("probabilidadePrecipita"),
+        required("idPeriodo"),
+        required("dataPrev", type=parse_utc_datetime),
+        required("ddVento", type=sys.intern),
+        optional_float("utci"),
+    ],
+)
+
+
 class Forecast_days:
     """Represents Forecast endpoint that retrieves 10 days objects."""
 
-    def __init__(self, api: IPMA_API):
-        """Initialize Forecast_days."""
+    def __init__(self, api: IPMA_API, max_locations=None):
+        """Initialize Forecast_days.
+
+        Parsed forecasts are kept for the max_locations most recently used
+        locations, by default as many as the payloads api.cache holds.
+        """
         self.data = None
         self.api = api
 
-        self.weather_type = Weather_Types(api)
-        self.forecast_locations = Forecast_Locations(api)
+        self.weather_type = api.registry.get(Weather_Types)
+        self.forecast_locations = api.registry.get(Forecast_Locations)
+        if max_locations is None:
+            max_locations = api.cache.max_entries if api.cache is not None else 0
+        self.max_locations = max_locations
+        self._by_location = OrderedDict()
+
+    def reset(self):
+        """Forget parsed forecasts."""
+        self._by_location.clear()
+
+    def endpoint(self, globalIdLocal):
+        """URL of the forecasts of globalIdLocal."""
+        return f"http://api.ipma.pt/public-data/forecast/aggregate/{globalIdLocal}.json"
 
     async def get(self, globalIdLocal, period: int = 24):
         """Retrieve forecasts from IPMA.
         periodo: 1: 3days, 3: 5days, 24: 10days
         """
         assert period in [1, 3, 24], "Forecast period must be 1h, 3h or 24h"
-        raw = await self.api.retrieve(
-            url=f"http://api.ipma.pt/public-data/forecast/aggregate/{globalIdLocal}.json"
-        )
-        self.data = sorted(
-            [
-                Forecast(
-                    tMed=float(r["tMed"]) if r.get("tMed") else None,
-                    tMin=float(r["tMin"]) if r.get("tMin") else None,
-                    ffVento=float(r["ffVento"]) if r.get("ffVento") else None,
-                    idFfxVento=r.get("idFfxVento"),
-                    dataUpdate=datetime.datetime.strptime(
-                        r["dataUpdate"], "%Y-%m-%dT%H:%M:%S"
-                    ),
-                    tMax=float(r["tMax"]) if r.get("tMax") else None,
-                    iUv=r.get("iUv"),
-                    intervaloHora=r.get("intervaloHora"),
-                    idTipoTempo=await self.weather_type.get(int(r["idTipoTempo"])),
-                    hR=r.get("hR"),
-                    location=await self.forecast_locations.find(
-                        int(r["globalIdLocal"])
-                    ),
-                    probabilidadePrecipita=float(r["probabilidadePrecipita"])
-                    if r["probabilidadePrecipita"] != -99
-                    else None,
-                    idPeriodo=r["idPeriodo"],
-                    dataPrev=datetime.datetime.strptime(
-                        r["dataPrev"], "%Y-%m-%dT%H:%M:%S"
-                    ).replace(tzinfo=datetime.timezone.utc),
-                    ddVento=r["ddVento"],
-                    utci=r.get("utci"),
-                )
-                for r in raw
-                if r["idPeriodo"] == period
-                and (
-                    (
-                        datetime.datetime.strptime(r["dataPrev"], "%Y-%m-%dT%H:%M:%S")
-                        > (datetime.datetime.now() - timedelta(hours=1))
-                        and period in (1, 3)
-                    )
-                    or (
-                        datetime.datetime.strptime(r["dataPrev"], "%Y-%m-%dT%H:%M:%S")
-                        > (datetime.datetime.now() - timedelta(days=1))
-                        and period == 24
+        self.data = await self._get(globalIdLocal, period)
+
+        return self.data
+
+    async def get_many(self, globalIdLocals, period: int = 24, max_concurrency=10):
+        """Retrieve forecasts of several locations concurrently.
+
+        Yields (globalIdLocal, forecasts) as each location completes, with an
+        empty list for locations that could not be retrieved.
+        """
+        assert period in [1, 3, 24], "Forecast period must be 1h, 3h or 24h"
+        await self.weather_type.load()
+        await self.forecast_locations.load()
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def fetch(globalIdLocal):
+            async with semaphore:
+                try:
+                    return globalIdLocal, await self._get(globalIdLocal, period)
+                except Exception as err:
+                    LOGGER.warning(
+                        "Could not retrieve forecast for %s: %s", globalIdLocal, err
                     )
-                )
-            ],
-            key=lambda d: d.dataPrev,
+                    return globalIdLocal, []
+
+        with default_priority(BULK):
+            tasks = [asyncio.ensure_future(fetch(g)) for g in globalIdLocals]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _get(self, globalIdLocal, period):
+        """Forecasts of globalIdLocal for period, sorted by date."""
+        series = await self._series(globalIdLocal)
+
+        if period in (1, 3):
+            window = timedelta(hours=1)
+        else:
+            window = timedelta(days=1)
+        # dataPrev is compared against the wall clock, as IPMA publishes it
+        cutoff = (datetime.datetime.now() - window).replace(
+            tzinfo=datetime.timezone.utc
         )
 
-        return self.data
+        return [f for f in series.get(period, []) if f.dataPrev > cutoff]
+
+    async def _series(self, globalIdLocal):
+        """Forecasts of globalIdLocal for every period, by idPeriodo.
+
+        The aggregate file holds all periods, so it is parsed once and kept
+        for as long as the API returns the same payload and reference data.
+        """
+        raw = await self.api.retrieve(url=self.endpoint(globalIdLocal))
+        # reloads the reference data once it expires
+        await self.weather_type.load()
+        await self.forecast_locations.load()
+        weather_type = self.weather_type.type_of
+        locations = self.forecast_locations.by_key
+
+        cached = self._by_location.get(globalIdLocal)
+        if cached is not None and cached[0] is raw and cached[2] is locations:
+            self._by_location.move_to_end(globalIdLocal)
+            return cached[1]
+
+        decode = FORECAST_DECODER.bind(
+            weather_type=lambda v: weather_type(int(v)),
+            location=lambda v: locations[int(v)],
+        )
+
+        series = {}
+        for r in raw:
+            series.setdefault(r["idPeriodo"], []).append(decode(r))
+
+        for forecasts in series.values():
+            forecasts.sort(key=lambda d: d.dataPrev)
+
+        if self.max_locations > 0:
+            self._by_location[globalIdLocal] = (raw, series, locations)
+            self._by_location.move_to_end(globalIdLocal)
+            while len(self._by_location) > self.max_locations:
+                self._by_location.popitem(last=False)
+        return series
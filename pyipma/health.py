@@ -0,0 +1,105 @@
+"""Health of stations and locations, to rank fallback candidates."""
+import time
+from dataclasses import dataclass
+
+from .distance import haversine
+
+HALF_LIFE = 6 * 3600  # seconds for a bad score to recover half way
+ALPHA = 0.5  # weight of the latest sample
+PENALTY = 4  # a candidate with no health counts as 1 + PENALTY times as far
+MIN_DISTANCE = 1.0  # km, so health also ranks candidates next to the point
+
+# Data up to the expected age (seconds) is fresh, older data loses half its
+# freshness every half age (seconds) beyond it.
+OBSERVATION_EXPECTED = 2 * 3600  # behind the newest observations
+OBSERVATION_AGE = 3 * 3600
+FORECAST_EXPECTED = 24 * 3600  # since dataUpdate, IPMA publishes twice a day
+FORECAST_AGE = 12 * 3600
+
+
+def freshness(age, half_age, expected=0):
+    """Freshness in [0, 1] of data age seconds old, 1.0 up to expected."""
+    return 0.5 ** (max(age - expected, 0) / half_age)
+
+
+def completeness(obj, fields):
+    """Fraction of fields of obj that are not None."""
+    return sum(getattr(obj, f) is not None for f in fields) / len(fields)
+
+
+@dataclass(slots=True)
+class Health:
+    """Decayed scores of a candidate, 1.0 is healthy and 0.0 is dead."""
+
+    success: float = 1.0
+    freshness: float = 1.0
+    completeness: float = 1.0
+    updated: float = 0.0
+
+    @property
+    def score(self):
+        return self.success * self.freshness * self.completeness
+
+
+class HealthTracker:
+    """Success, freshness and completeness of candidates, by key.
+
+    Each sample moves the scores of a key by ALPHA towards the sampled
+    values, and scores recover towards healthy with half_life between
+    samples so that bad candidates are eventually tried again. Held in the
+    registry, so it is shared by all locations of an IPMA_API.
+    """
+
+    def __init__(self, api=None, half_life=HALF_LIFE, alpha=ALPHA):
+        self.half_life = half_life
+        self.alpha = alpha
+        self.clock = time.monotonic
+        self._health = {}
+
+    def reset(self):
+        """Health is learned from the API, not from reference data."""
+
+    def _recovered(self, key):
+        health = self._health.get(key)
+        if health is None:
+            return Health(updated=self.clock())
+
+        now = self.clock()
+        decay = 0.5 ** ((now - health.updated) / self.half_life)
+        return Health(
+            1 - (1 - health.success) * decay,
+            1 - (1 - health.freshness) * decay,
+            1 - (1 - health.completeness) * decay,
+            now,
+        )
+
+    def record(self, key, success=True, freshness=1.0, completeness=1.0):
+        """Sample the health of key, freshness and completeness in [0, 1]."""
+        health = self._recovered(key)
+        if not success:
+            freshness = health.freshness
+            completeness = health.completeness
+
+        alpha = self.alpha
+        health.success += alpha * (float(success) - health.success)
+        health.freshness += alpha * (freshness - health.freshness)
+        health.completeness += alpha * (completeness - health.completeness)
+        self._health[key] = health
+
+    def health(self, key):
+        """Current health of key, in [0, 1]."""
+        return self._recovered(key).score
+
+    def rank(self, point, candidates, keys):
+        """candidates by distance to point weighted by the health of keys."""
+        found = haversine(point, [c.coordinates for c in candidates])
+        weighted = [
+            max(d, MIN_DISTANCE) * (1 + PENALTY * (1 - self.health(key)))
+            for d, key in zip(found, keys)
+        ]
+        order = sorted(range(len(candidates)), key=lambda i: (weighted[i], i))
+        return [candidates[i] for i in order]
+
+    def stats(self):
+        """Current health of every tracked key."""
+        return {key: self.health(key) for key in self._health}
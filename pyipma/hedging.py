@@ -0,0 +1,52 @@
+"""Hedged requests over a chain of fallback candidates."""
+import asyncio
+
+from . import IPMAException
+
+
+async def hedge(calls, delay=None, deadline=None, valid=None):
+    """Result of the first of calls to succeed, in order of preference.
+
+    calls are coroutine functions taking no arguments. The first is started
+    right away and the next one when the running calls fail, or when delay
+    seconds pass without a result; without a delay they run one at a time.
+    Results rejected by valid count as failures. The calls still running
+    when a result is found, or when deadline seconds have passed, are
+    cancelled.
+    """
+    try:
+        return await asyncio.wait_for(_hedge(calls, delay, valid), deadline)
+    except asyncio.TimeoutError as err:
+        raise IPMAException(f"No result within {deadline} seconds") from err
+
+
+async def _hedge(calls, delay, valid):
+    remaining = iter(calls)
+    started = []
+    pending = set()
+    error = None
+
+    try:
+        while True:
+            call = next(remaining, None)
+            if call is not None:
+                started.append(asyncio.ensure_future(call()))
+                pending.add(started[-1])
+            elif not pending:
+                break
+
+            done, pending = await asyncio.wait(
+                pending,
+                timeout=delay if call is not None else None,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            for task in (task for task in started if task in done):
+                if task.exception() is not None:
+                    error = task.exception()
+                elif valid is None or valid(task.result()):
+                    return task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+    raise IPMAException("No candidate succeeded") from error
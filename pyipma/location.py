@@ -1,5 +1,13 @@
 """Representation of a Weather Station from IPMA."""
+import asyncio
 import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import partial
+from typing import Optional
+
+from . import IPMAException
 
 from .auxiliar import (
     Districts,
@@ -10,15 +18,143 @@ from .auxiliar import (
     Station,
     Stations,
 )
-from .forecast import Forecast_days
-from .observation import Observations
-from .sea_forecast import SeaForecasts
-from .rcm import RCM_day
-from .uv import UV_risks
-from .warnings import Warnings
+from .distance import HAVERSINE
+from .forecast import Forecast, Forecast_days
+from .health import (
+    FORECAST_AGE,
+    FORECAST_EXPECTED,
+    OBSERVATION_AGE,
+    OBSERVATION_EXPECTED,
+    HealthTracker,
+    completeness,
+    freshness,
+)
+from .hedging import hedge
+from .ratelimit import INTERACTIVE, prioritized
+from .observation import Observation, Observations
+from .sea_forecast import SeaForecast, SeaForecasts
+from .rcm import RCM, RCM_day
+from .uv import UV, UV_risks
+from .warnings import Warning, Warnings
 
 LOGGER = logging.getLogger(__name__)  # pylint: disable=invalid-name
 
+CANDIDATES = 10  # nearby locations/stations kept as fallbacks
+PRECISION = 0.01  # degrees, points closer than this share their lookups
+
+# Fields of an Observation that count towards the completeness of a station.
+# Pressure, radiation and precipitation are left out, as many stations never
+# report them.
+OBSERVATION_FIELDS = ("temperatura", "humidade", "intensidadeVento")
+
+PRODUCTS = (
+    "forecast",
+    "observation",
+    "sea_forecast",
+    "fire_risk",
+    "uv_risk",
+    "warnings",
+)
+
+
+def reference_parser(api, cls, accuracy=HAVERSINE):
+    """Shared instance of the reference parser cls searched with accuracy."""
+    if accuracy == HAVERSINE:
+        return api.registry.get(cls)
+    return api.registry.get(cls, accuracy)
+
+
+async def nearest(parser, layer, lon, lat, raster=None, k=CANDIDATES):
+    """k entries of parser nearest to (lon, lat), looked up in raster if given.
+
+    The raster ranks entries by HAVERSINE distance, so it is only used by
+    parsers of that accuracy. The reference data is searched instead when
+    the raster ranks entries it no longer has.
+    """
+    if parser.accuracy != HAVERSINE:
+        raster = None
+    ids = raster.nearest(layer, lon, lat) if raster is not None else None
+    if ids is not None:
+        await parser.load()
+        if all(i in parser.by_key for i in ids[:k]):
+            return await parser.find_many(ids[:k])
+        LOGGER.debug("Raster %s layer is out of date, searching", layer)
+    return await parser.get(lon, lat, k)
+
+
+@dataclass(slots=True)
+class Snapshot:
+    """All products of a Location, see Location.snapshot."""
+
+    forecast: list[Forecast] = field(default_factory=list)
+    observation: Optional[Observation] = None
+    sea_forecast: list[SeaForecast] = field(default_factory=list)
+    fire_risk: Optional[RCM] = None
+    uv_risk: Optional[UV] = None
+    warnings: Optional[list[Warning]] = None
+    errors: dict[str, Exception] = field(default_factory=dict)
+
+
+class NearbyCache:
+    """LRU of the nearby reference entries of quantized coordinates.
+
+    Held in the registry, so it is shared by all Location.get calls of an
+    IPMA_API and cleared whenever the reference data is refreshed.
+    """
+
+    def __init__(self, api, precision=PRECISION, max_entries=1024):
+        self.precision = precision
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def key(self, lon, lat, sea_stations, accuracy=HAVERSINE):
+        """Key of the cell of (lon, lat)."""
+        return (
+            round(lon / self.precision),
+            round(lat / self.precision),
+            sea_stations,
+            accuracy,
+        )
+
+    def get(self, key):
+        """Nearby entries of key, if cached."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry
+
+    def store(self, key, entry):
+        """Cache the nearby entries of key."""
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def reset(self):
+        self._entries.clear()
+
+    def stats(self):
+        """Cache counters."""
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
 
 class Location:
     """Represents a Location (district)."""
@@ -30,27 +166,56 @@ class Location:
         forecast_locations: list[Forecast_Location],
         observation_stations: list[Station],
         sea_stations: list[Sea_Location],
+        raster=None,
+        accuracy=HAVERSINE,
     ):
         self.coordinates = (longitude, latitude)
         self.forecast_locations = forecast_locations
         self.observation_stations = observation_stations
         self.sea_stations = sea_stations
         self.districts = None
+        self.raster = raster
+        self.accuracy = accuracy
+        self._districts_lookup = None
 
     @classmethod
-    async def get(cls, api, lon, lat, sea_stations=False):
-        """Retrieve the nearest location and associated station."""
-
-        forecast_locations = Forecast_Locations(api)
-        near_locations = await forecast_locations.get(lon, lat)
-
-        stations = Stations(api)
-        near_stations = await stations.get(lon, lat)
-
-        near_sea_locations = None
-        if sea_stations:
-            sea_locations = Sea_Locations(api)
-            near_sea_locations = await sea_locations.get(lon, lat)
+    @prioritized(INTERACTIVE)
+    async def get(
+        cls,
+        api,
+        lon,
+        lat,
+        sea_stations=False,
+        raster=None,
+        memo=True,
+        accuracy=HAVERSINE,
+    ):
+        """Retrieve the nearest location and associated station.
+
+        Distances are computed with accuracy, HAVERSINE or GEODESIC. A
+        NearestRaster resolves the nearest entries without searching the
+        reference data, which is still searched where the raster is unsure.
+        Lookups are memoized per PRECISION cell unless memo is False, see
+        api.registry.get(NearbyCache).stats().
+        """
+        cache = api.registry.get(NearbyCache)
+        key = cache.key(lon, lat, sea_stations, accuracy)
+        nearby = cache.get(key) if memo else None
+
+        if nearby is None:
+            layers = [("forecast", Forecast_Locations), ("stations", Stations)]
+            if sea_stations:
+                layers.append(("sea", Sea_Locations))
+            lookups = [
+                nearest(reference_parser(api, cls, accuracy), layer, lon, lat, raster)
+                for layer, cls in layers
+            ]
+            nearby = tuple(await asyncio.gather(*lookups))
+            if memo:
+                cache.store(key, nearby)
+
+        near_locations, near_stations, *near_sea_locations = nearby
+        near_sea_locations = near_sea_locations[0] if sea_stations else None
 
         LOGGER.info(
             "Using %s as weather station for %s",
@@ -58,7 +223,15 @@ class Location:
             near_locations[0].local,
         )
 
-        return Location(lat, lon, near_locations, near_stations, near_sea_locations)
+        return Location(
+            lat,
+            lon,
+            near_locations,
+            near_stations,
+            near_sea_locations,
+            raster,
+            accuracy,
+        )
 
     @property
     def name(self):
@@ -105,120 +278,250 @@ class Location:
         return None
 
     async def get_districts(self, api):
+        """Districts nearest to the location, looked up once and shared."""
         if self.districts is None:
-            self.districts = await Districts(api).get(*self.coordinates)
+            if self._districts_lookup is None:
+                districts = reference_parser(api, Districts, self.accuracy)
+                self._districts_lookup = asyncio.ensure_future(
+                    nearest(districts, "districts", *self.coordinates, self.raster)
+                )
+            lookup = self._districts_lookup
+            try:
+                self.districts = await asyncio.shield(lookup)
+            finally:
+                if lookup.done():
+                    self._districts_lookup = None
 
         return self.districts
 
-    async def forecast(self, api, period=24):
-        """Retrieve forecasts of location."""
-        forecast_days = Forecast_days(api)
-        forecasts = []
+    @prioritized(INTERACTIVE)
+    async def forecast(self, api, period=24, delay=None, deadline=None):
+        """Retrieve forecasts of location.
 
-        for forecast_location in self.forecast_locations[:10]:
+        Candidate locations are tried in turn until one has forecasts, see
+        hedge() for delay and deadline. Returns [] if none has.
+        """
+        try:
+            return await self._forecast(api, period, delay, deadline)
+        except IPMAException:
+            return []
+
+    async def _forecast(self, api, period, delay=None, deadline=None):
+        forecast_days = api.registry.get(Forecast_days)
+        tracker = api.registry.get(HealthTracker)
+
+        async def attempt(forecast_location):
+            key = ("forecast", forecast_location.globalIdLocal)
             try:
                 forecasts = await forecast_days.get(
                     forecast_location.globalIdLocal, period
                 )
-                break
             except Exception as err:
+                tracker.record(key, success=False)
                 LOGGER.warning(
                     "Could not retrieve forecast for %s: %s", forecast_location, err
                 )
+                raise
+            if forecasts:
+                updated = forecasts[0].dataUpdate
+                age = datetime.now(updated.tzinfo) - updated
+                tracker.record(
+                    key,
+                    freshness=freshness(
+                        age.total_seconds(), FORECAST_AGE, FORECAST_EXPECTED
+                    ),
+                )
+            else:
+                tracker.record(key, completeness=0.0)
+            return forecasts
+
+        candidates = self.forecast_locations[:CANDIDATES]
+        candidates = tracker.rank(
+            self.coordinates,
+            candidates,
+            [("forecast", c.globalIdLocal) for c in candidates],
+        )
+        try:
+            return await hedge(
+                [partial(attempt, c) for c in candidates],
+                delay,
+                deadline,
+                valid=bool,
+            )
+        except IPMAException as err:
+            raise IPMAException(
+                f"Could not retrieve a forecast for {self.name}: {err}"
+            ) from err
 
-        return forecasts
-
+    @prioritized(INTERACTIVE)
     async def observation(self, api):
         """Retrieve observation of Estacao."""
-        obs = Observations(api)
-        for station in self.observation_stations[:10]:
-            try:
-                LOGGER.debug("Get Observation for %s", station.idEstacao)
-                observations = await obs.get(station.idEstacao)
-                if len(observations) and observations[-1] is not None:
-                    return observations[-1]
-            except Exception as err:
-                LOGGER.warning(
-                    "Could not retrieve obsertation for %s: %s", station, err
-                )
-        LOGGER.error("Could not retrieve a valid observation for %s", self.name)
+        try:
+            return await self._observation(api)
+        except IPMAException as err:
+            LOGGER.error("%s", err)
+        except Exception as err:
+            LOGGER.warning("Could not retrieve observations: %s", err)
         return None
 
-    async def sea_forecast(self, api):
-        """Retrieve today's sea forecast for closest sea location."""
-        forecast_3days = SeaForecasts(api)
-        forecasts = []
+    async def _observation(self, api):
+        snapshot = await api.registry.get(Observations).snapshot()
+        tracker = api.registry.get(HealthTracker)
+
+        candidates = self.observation_stations[:CANDIDATES]
+        candidates = tracker.rank(
+            self.coordinates,
+            candidates,
+            [("station", c.idEstacao) for c in candidates],
+        )
+        for station in candidates:
+            LOGGER.debug("Get Observation for %s", station.idEstacao)
+            key = ("station", station.idEstacao)
+            observation = snapshot.latest(station.idEstacao)
+            if observation is None:
+                tracker.record(key, success=False)
+                continue
+
+            age = snapshot.newest - observation.timestamp
+            tracker.record(
+                key,
+                freshness=freshness(
+                    age.total_seconds(), OBSERVATION_AGE, OBSERVATION_EXPECTED
+                ),
+                completeness=completeness(observation, OBSERVATION_FIELDS),
+            )
+            return observation
+
+        raise IPMAException(f"Could not retrieve a valid observation for {self.name}")
+
+    @prioritized(INTERACTIVE)
+    async def sea_forecast(self, api, delay=None, deadline=None):
+        """Retrieve today's sea forecast for closest sea location.
 
-        for sea_location in self.sea_stations[:10]:
+        Candidate locations are tried in turn until one has forecasts, see
+        hedge() for delay and deadline. Returns [] if none has.
+        """
+        try:
+            return await self._sea_forecast(api, delay, deadline)
+        except IPMAException:
+            return []
+
+    async def _sea_forecast(self, api, delay=None, deadline=None):
+        if self.sea_stations is None:
+            raise IPMAException(
+                "No sea locations, use Location.get(..., sea_stations=True)"
+            )
+        forecast_3days = api.registry.get(SeaForecasts)
+
+        async def attempt(sea_location):
             try:
-                forecasts = await forecast_3days.get(sea_location.globalIdLocal)
-                break
+                return await forecast_3days.get(sea_location.globalIdLocal)
             except Exception as err:
                 LOGGER.warning(
                     "Could not retrieve forecast for %s: %s", sea_location, err
                 )
+                raise
 
-        return forecasts
+        try:
+            return await hedge(
+                [partial(attempt, c) for c in self.sea_stations[:CANDIDATES]],
+                delay,
+                deadline,
+                valid=bool,
+            )
+        except IPMAException as err:
+            raise IPMAException(
+                f"Could not retrieve a sea forecast for {self.name}: {err}"
+            ) from err
 
+    @prioritized(INTERACTIVE)
     async def fire_risk(self, api, day=0):
         """Retrieve Fire Risk (RCM) for DICO region closest to the current location."""
-        rcms = RCM_day(api, day)
-        risk = None
-
         try:
-            risks = await rcms.get(*self.coordinates)
-            if risks:
-                risk = risks[0]
+            return await self._fire_risk(api, day)
         except Exception as err:
             LOGGER.warning(
                 "Could not retrieve RCM for %s: %s",
                 "today" if day == 0 else "tomorrow",
                 err,
             )
+        return None
 
-        return risk
+    async def _fire_risk(self, api, day):
+        rcms = RCM_day(api, day, self.accuracy)
+        risks = await nearest(rcms, "dico", *self.coordinates, self.raster, 1)
+        return risks[0] if risks else None
 
+    @prioritized(INTERACTIVE)
     async def uv_risk(self, api):
         """Retrieve UV Risk for the current location."""
-        uvs = UV_risks(api)
-        district_id = None
-
         try:
-            districts = await self.get_districts(api)
-            district_id = districts[0].globalIdLocal
-            if district_id:
-                result = await uvs.get(district_id)
-                if result:
-                    return result[0]
+            return await self._uv_risk(api)
         except Exception as err:
-            LOGGER.warning(
-                "Could not retrieve UV for %s: %s",
-                district_id,
-                err,
-            )
+            LOGGER.warning("Could not retrieve UV for %s: %s", self.name, err)
+        return None
 
+    async def _uv_risk(self, api):
+        districts = await self.get_districts(api)
+        district_id = districts[0].globalIdLocal
+        if district_id:
+            result = await UV_risks(api).get(district_id)
+            if result:
+                return result[0]
         return None
-    
+
+    @prioritized(INTERACTIVE)
     async def warnings(self, api):
         """Retrieve Warnings for the current location."""
-
-        warnings = Warnings(api)
-
         try:
-            districts = await self.get_districts(api)
-            area_id = districts[0].idAreaAviso
-
-            if area_id:
-                return await warnings.get(area_id)
-
+            return await self._warnings(api)
         except Exception as err:
-            LOGGER.warning(
-                "Could not retrieve Warnings for %s: %s",
-                area_id,
-                err,
-            )
-
+            LOGGER.warning("Could not retrieve Warnings for %s: %s", self.name, err)
         return None
 
+    async def _warnings(self, api):
+        districts = await self.get_districts(api)
+        area_id = districts[0].idAreaAviso
+        if area_id:
+            return await Warnings(api).get(area_id)
+        return None
 
+    @prioritized(INTERACTIVE)
+    async def snapshot(
+        self, api, period=24, day=0, products=None, delay=None, deadline=None
+    ):
+        """Retrieve all products of the location concurrently.
+
+        products defaults to all of PRODUCTS, without sea_forecast when the
+        location has no sea locations. delay and deadline apply to the
+        forecast and sea_forecast candidates. Products that could not be retrieved
+        keep their default value and their error is kept in Snapshot.errors.
+        """
+        if products is None:
+            products = [
+                product
+                for product in PRODUCTS
+                if product != "sea_forecast" or self.sea_stations is not None
+            ]
+        calls = {
+            "forecast": lambda: self._forecast(api, period, delay, deadline),
+            "observation": lambda: self._observation(api),
+            "sea_forecast": lambda: self._sea_forecast(api, delay, deadline),
+            "fire_risk": lambda: self._fire_risk(api, day),
+            "uv_risk": lambda: self._uv_risk(api),
+            "warnings": lambda: self._warnings(api),
+        }
+        results = await asyncio.gather(
+            *(calls[product]() for product in products), return_exceptions=True
+        )
 
+        snapshot = Snapshot()
+        for product, result in zip(products, results):
+            if isinstance(result, Exception):
+                LOGGER.warning(
+                    "Could not retrieve %s for %s: %s", product, self.name, result
+                )
+                snapshot.errors[product] = result
+            else:
+                setattr(snapshot, product, result)
+        return snapshot
@@ -5,7 +5,16 @@ from dataclasses import dataclass
 
 from typing import Optional
 
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, only ObservationStore needs it
+    np = None
+
+from . import IPMAException
 from .api import IPMA_API
+from .schema import Decoder, optional_float, required
+from .streaming import ObservationStreamParser
+from .timestamps import parse_datetime
 
 LOGGER = logging.getLogger(__name__)
 
@@ -23,7 +32,7 @@ WIND_DIRECTION_ID = {
 }
 
 
-@dataclass
+@dataclass(slots=True)
 class Observation:
     """Represents a Meteo Station (district)."""
 
@@ -83,6 +92,151 @@ class Observation:
         return f"Weather in {self.idEstacao} at {self.timestamp}: {self.temperature}°C, {self.humidity}%"
 
 
+OBSERVATION_DECODER = Decoder(
+    Observation,
+    [
+        optional_float("intensidadeVentoKM"),
+        optional_float("temperatura"),
+        optional_float("radiacao"),
+        required("idDireccVento"),
+        optional_float("precAcumulada"),
+        optional_float("intensidadeVento"),
+        optional_float("humidade"),
+        optional_float("pressao"),
+    ],
+    args=("timestamp", "idEstacao"),
+).bind()
+
+
+class ObservationSnapshot:
+    """Observations of every station, parsed once and indexed by station."""
+
+    def __init__(self, raw):
+        self.stations = {}
+
+        for timestamp, records in raw.items():
+            timestamp = parse_datetime(timestamp)
+            for estacao, r in records.items():
+                if r is None:
+                    continue
+                idEstacao = int(estacao)
+                self.stations.setdefault(idEstacao, []).append(
+                    OBSERVATION_DECODER(r, timestamp, idEstacao)
+                )
+
+        for observations in self.stations.values():
+            observations.sort(key=lambda d: d.timestamp)
+
+        self.newest = max(
+            (observations[-1].timestamp for observations in self.stations.values()),
+            default=None,
+        )
+
+    def __contains__(self, idEstacao):
+        return int(idEstacao) in self.stations
+
+    def get(self, idEstacao):
+        """Observations of idEstacao, oldest first."""
+        return list(self.stations.get(int(idEstacao), []))
+
+    def latest(self, idEstacao):
+        """Most recent observation of idEstacao, if any."""
+        observations = self.stations.get(int(idEstacao))
+        return observations[-1] if observations else None
+
+
+class ObservationStore:
+    """Columnar store of observations, one (station x timestamp) array per field.
+
+    Missing records and -99 sentinels are stored as NaN.
+    """
+
+    FIELDS = (
+        "intensidadeVentoKM",
+        "temperatura",
+        "radiacao",
+        "idDireccVento",
+        "precAcumulada",
+        "intensidadeVento",
+        "humidade",
+        "pressao",
+    )
+
+    def __init__(self, raw):
+        if np is None:
+            raise ImportError("ObservationStore requires numpy")
+
+        self.timestamps = sorted(raw)
+        stations = sorted({int(e) for records in raw.values() for e in records})
+        self.stations = np.array(stations, dtype=np.int64)
+        self._row = {idEstacao: row for row, idEstacao in enumerate(stations)}
+
+        positions = []
+        values = []
+        for col, timestamp in enumerate(self.timestamps):
+            for estacao, r in raw[timestamp].items():
+                if r is None:
+                    continue
+                positions.append((self._row[int(estacao)], col))
+                values.append([r.get(field) for field in self.FIELDS])
+
+        shape = (len(stations), len(self.timestamps))
+        self.present = np.zeros(shape, dtype=bool)
+        data = np.full(shape + (len(self.FIELDS),), np.nan)
+        if positions:
+            rows, cols = np.array(positions).T
+            values = np.array(values, dtype=float)  # None becomes NaN
+            values[values == -99] = np.nan
+            self.present[rows, cols] = True
+            data[rows, cols] = values
+
+        self.columns = {field: data[:, :, i] for i, field in enumerate(self.FIELDS)}
+        self.timestamps = [parse_datetime(t) for t in self.timestamps]
+
+    def __contains__(self, idEstacao):
+        return int(idEstacao) in self._row
+
+    def series(self, idEstacao, field):
+        """Values of field for idEstacao, oldest first."""
+        return self.columns[field][self._row[int(idEstacao)]]
+
+    def _observation(self, row, col):
+        values = {
+            field: None if np.isnan(column[row, col]) else float(column[row, col])
+            for field, column in self.columns.items()
+        }
+        if values["idDireccVento"] is not None:
+            values["idDireccVento"] = int(values["idDireccVento"])
+        return Observation(
+            **values,
+            timestamp=self.timestamps[col],
+            idEstacao=int(self.stations[row]),
+        )
+
+    def latest_index(self, required=()):
+        """Rows and timestamp columns of the newest valid record per station.
+
+        A record is valid when present and none of the required fields is NaN.
+        Stations without a valid record are left out.
+        """
+        valid = self.present.copy()
+        for field in required:
+            valid &= ~np.isnan(self.columns[field])
+
+        has_valid = valid.any(axis=1)
+        last = valid.shape[1] - 1 - np.argmax(valid[:, ::-1], axis=1)
+        rows = np.flatnonzero(has_valid)
+        return rows, last[rows]
+
+    def latest_all(self, required=()):
+        """Newest valid observation of every station, by idEstacao."""
+        rows, cols = self.latest_index(required)
+        return {
+            int(self.stations[row]): self._observation(row, col)
+            for row, col in zip(rows, cols)
+        }
+
+
 class Observations:
     """Represents a Meteo Station endpoint that retrieves Observation objects."""
 
@@ -92,33 +246,69 @@ class Observations:
     ):
         self.data = None
         self.api = api
+        self.endpoint = "https://api.ipma.pt/open-data/observation/meteorology/stations/observations.json"
+        self._raw = None
+        self._snapshot = None
+        self._store_raw = None
+        self._store = None
+
+    def reset(self):
+        """Forget the parsed snapshot and store."""
+        self._raw = None
+        self._snapshot = None
+        self._store_raw = None
+        self._store = None
+
+    async def snapshot(self):
+        """Retrieve observations of all stations from IPMA."""
+        raw = await self.api.retrieve(url=self.endpoint)
+
+        if raw is None:
+            raise IPMAException("Could not retrieve observations")
+
+        # the response cache hands back the same payload while it is current
+        if raw is not self._raw:
+            self._snapshot = ObservationSnapshot(raw)
+            self._raw = raw
+
+        return self._snapshot
 
-    async def get(self, idEstacao):
+    async def store(self):
+        """Retrieve observations of all stations into an ObservationStore."""
+        raw = await self.api.retrieve(url=self.endpoint)
+
+        if raw is None:
+            raise IPMAException("Could not retrieve observations")
+
+        if raw is not self._store_raw:
+            self._store = ObservationStore(raw)
+            self._store_raw = raw
+
+        return self._store
+
+    async def stream(self, stations=None):
+        """Yield observations as observations.json downloads.
+
+        Only records of stations (all if None) are decoded, which keeps
+        memory bounded on small devices.
+        """
+        parser = ObservationStreamParser(stations)
+        async for chunk in self.api.stream(self.endpoint):
+            for timestamp, estacao, r in parser.feed(chunk):
+                yield OBSERVATION_DECODER(r, parse_datetime(timestamp), int(estacao))
+        parser.close()
+
+    async def get(self, idEstacao, streaming=False):
         """Retrieve observations from IPMA."""
-        raw = await self.api.retrieve(
-            url="https://api.ipma.pt/open-data/observation/meteorology/stations/observations.json"
-        )
-        idEstacao = str(idEstacao)
-
-        self.data = sorted(
-            [
-                Observation(
-                    r["intensidadeVentoKM"] if r["intensidadeVentoKM"] != -99 else None,
-                    r["temperatura"] if r["temperatura"] != -99 else None,
-                    r["radiacao"] if r["radiacao"] != -99 else None,
-                    r["idDireccVento"],
-                    r["precAcumulada"] if r["precAcumulada"] != -99 else None,
-                    r["intensidadeVento"] if r["intensidadeVento"] != 99 else None,
-                    r["humidade"] if r["humidade"] != -99 else None,
-                    r["pressao"] if r["pressao"] != -99 else None,
-                    datetime.datetime.strptime(timestamp, "%Y-%m-%dT%H:%M"),
-                    int(estacao),
-                )
-                for timestamp in raw
-                for estacao, r in raw[timestamp].items()
-                if r is not None and estacao == idEstacao
-            ],
-            key=lambda d: d.timestamp,
-        )
+        if streaming:
+            self.data = sorted(
+                [o async for o in self.stream([idEstacao])],
+                key=lambda d: d.timestamp,
+            )
+            return self.data
+
+        snapshot = await self.snapshot()
+
+        self.data = snapshot.get(idEstacao)
 
         return self.data
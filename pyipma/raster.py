@@ -0,0 +1,213 @@
+"""Precomputed nearest reference locations on a grid over Portugal."""
+import json
+import struct
+import sys
+from array import array
+
+from .auxiliar import Districts, Forecast_Locations, Sea_Locations, Stations
+from .distance import EARTH_RADIUS_KM, haversine, haversine_matrix, np
+from .rcm import RCM_day
+
+MAGIC = b"PYIPMAR1"
+
+# (min latitude, max latitude, min longitude, max longitude)
+REGIONS = {
+    "mainland": (36.8, 42.3, -9.7, -6.0),
+    "madeira": (32.3, 33.3, -17.5, -16.0),
+    "azores": (36.8, 39.9, -31.5, -24.8),
+}
+
+# Reference parsers rasterized by build_raster, by layer name.
+LAYERS = {
+    "forecast": Forecast_Locations,
+    "stations": Stations,
+    "districts": Districts,
+    "sea": Sea_Locations,
+    "dico": RCM_day,
+}
+
+CERTAIN, REFINE, SEARCH = 0, 1, 2  # cell flags
+EMPTY = 0xFFFF  # padding of layers with less than k items
+
+
+class NearestRaster:
+    """Grid cells holding the ranked k nearest ids of each reference layer.
+
+    A cell is CERTAIN when its first id is the nearest from every point of
+    the cell, REFINE when the nearest is one of its k ids and is picked by
+    distance, and SEARCH when only a full search of the layer is exact.
+    Lookups are pure Python, building the raster requires numpy.
+    """
+
+    def __init__(self, resolution, k, regions, layers, cells):
+        self.resolution = resolution
+        self.k = k
+        self.regions = regions  # name -> (lat0, lat1, lon0, lon1, rows, cols)
+        self.layers = layers  # name -> (ids, coordinates)
+        self.cells = cells  # (region, layer) -> (flags, positions)
+
+    @classmethod
+    def build(cls, layers, resolution=0.05, k=10, regions=REGIONS):
+        """Build from {layer: [(id, (lat, lon)), ...]}."""
+        if np is None:
+            raise ImportError("Building a NearestRaster requires numpy")
+
+        layers = {
+            name: ([i for i, _ in entries], [tuple(c) for _, c in entries])
+            for name, entries in layers.items()
+        }
+        for name, (ids, _) in layers.items():
+            if len(ids) >= EMPTY:
+                raise ValueError(f"Layer {name} has too many items")
+
+        grid = {}
+        cells = {}
+        for region, (lat0, lat1, lon0, lon1) in regions.items():
+            rows = int(round((lat1 - lat0) / resolution))
+            cols = int(round((lon1 - lon0) / resolution))
+            grid[region] = (lat0, lat1, lon0, lon1, rows, cols)
+
+            lats = lat0 + (np.arange(rows) + 0.5) * resolution
+            lons = lon0 + (np.arange(cols) + 0.5) * resolution
+            centers = np.stack(np.meshgrid(lats, lons, indexing="ij"), -1)
+            centers = centers.reshape(-1, 2)
+            half = resolution / 2
+            # corners towards the equator are the farthest from the centre
+            reach = np.maximum(
+                _pairwise(centers, centers + [half, half]),
+                _pairwise(centers, centers + [-half, half]),
+            )
+
+            for name, (_, coordinates) in layers.items():
+                cells[region, name] = _rank_cells(centers, reach, coordinates, k)
+
+        return cls(resolution, k, grid, layers, cells)
+
+    def _cell(self, lat, lon):
+        for region, (lat0, lat1, lon0, lon1, rows, cols) in self.regions.items():
+            if lat0 <= lat < lat1 and lon0 <= lon < lon1:
+                row = min(int((lat - lat0) / self.resolution), rows - 1)
+                col = min(int((lon - lon0) / self.resolution), cols - 1)
+                return region, row * cols + col
+        return None, None
+
+    def nearest(self, layer, lon, lat):
+        """Ids of layer nearest to (lon, lat), closest first, or None.
+
+        The point is in the order of the coordinates tuples, as passed to
+        Location.get(api, lon, lat). None is returned outside the grid, for
+        layers the raster was not built with and where a full search is
+        needed. The first id is exact, the others are
+        ranked from the cell centre unless the cell is refined.
+        """
+        if layer not in self.layers:
+            return None
+        region, cell = self._cell(lon, lat)
+        if region is None:
+            return None
+
+        flags, positions = self.cells[region, layer]
+        if flags[cell] == SEARCH:
+            return None
+
+        ids, coordinates = self.layers[layer]
+        ranked = [
+            p for p in positions[cell * self.k : (cell + 1) * self.k] if p != EMPTY
+        ]
+        if flags[cell] == REFINE:
+            found = haversine((lon, lat), [coordinates[p] for p in ranked])
+            ranked = [p for _, p in sorted(zip(found, ranked))]
+        return [ids[p] for p in ranked]
+
+    def save(self, path):
+        """Write the raster to a compact binary file."""
+        header = json.dumps(
+            {
+                "resolution": self.resolution,
+                "k": self.k,
+                "regions": self.regions,
+                "layers": self.layers,
+            }
+        ).encode()
+
+        with open(path, "wb") as raster:
+            raster.write(MAGIC)
+            raster.write(struct.pack("<I", len(header)))
+            raster.write(header)
+            for region in self.regions:
+                for layer in self.layers:
+                    flags, positions = self.cells[region, layer]
+                    if sys.byteorder == "big":
+                        positions = array("H", positions)
+                        positions.byteswap()
+                    raster.write(flags.tobytes())
+                    raster.write(positions.tobytes())
+
+    @classmethod
+    def load(cls, path):
+        """Read a raster written by save()."""
+        with open(path, "rb") as raster:
+            if raster.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a pyipma raster")
+            (length,) = struct.unpack("<I", raster.read(4))
+            header = json.loads(raster.read(length))
+
+            regions = {name: tuple(r) for name, r in header["regions"].items()}
+            layers = {
+                name: (ids, [tuple(c) for c in coordinates])
+                for name, (ids, coordinates) in header["layers"].items()
+            }
+            cells = {}
+            for region, (*_, rows, cols) in regions.items():
+                for layer in layers:
+                    flags = array("B", raster.read(rows * cols))
+                    positions = array("H")
+                    positions.frombytes(raster.read(rows * cols * header["k"] * 2))
+                    if sys.byteorder == "big":
+                        positions.byteswap()
+                    cells[region, layer] = (flags, positions)
+
+        return cls(header["resolution"], header["k"], regions, layers, cells)
+
+
+def _pairwise(points, others):
+    """Great circle distances between matching rows of points and others."""
+    lat1, lon1 = np.radians(points).T
+    lat2, lon2 = np.radians(others).T
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def _rank_cells(centers, reach, coordinates, k):
+    """Flags and k nearest positions of coordinates for each cell centre.
+
+    An item can be the nearest somewhere in a cell only if it is within
+    2 * reach of the distance from the centre to the nearest item.
+    """
+    found = haversine_matrix(centers, coordinates)
+    order = np.argsort(found, axis=1, kind="stable")
+    ranked = np.take_along_axis(found, order, axis=1)
+    top = min(k, len(coordinates))
+
+    positions = np.full((len(centers), k), EMPTY, dtype=np.uint16)
+    positions[:, :top] = order[:, :top]
+
+    contenders = (ranked <= ranked[:, :1] + 2 * reach[:, None]).sum(axis=1)
+    flags = np.where(
+        contenders == 1, CERTAIN, np.where(contenders <= top, REFINE, SEARCH)
+    ).astype(np.uint8)
+
+    return array("B", flags.tobytes()), array("H", positions.ravel().tolist())
+
+
+async def build_raster(api, resolution=0.05, k=10, layers=LAYERS):
+    """Build a NearestRaster of the reference data of api."""
+    entries = {}
+    for name, cls in layers.items():
+        parser = api.registry.get(cls)
+        await parser.load()
+        entries[name] = [(getattr(d, parser.key), d.coordinates) for d in parser.data]
+    return NearestRaster.build(entries, resolution, k)
@@ -0,0 +1,172 @@
+"""Rate limiting and prioritisation of requests to the IPMA API."""
+import asyncio
+import contextvars
+import functools
+import itertools
+import logging
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+LOGGER = logging.getLogger(__name__)
+
+INTERACTIVE, NORMAL, BULK = 0, 1, 2  # request priorities, lowest first
+
+_priority = contextvars.ContextVar("pyipma_priority", default=None)
+
+
+def current_priority():
+    """Priority of requests issued from the current context."""
+    level = _priority.get()
+    return NORMAL if level is None else level
+
+
+@contextmanager
+def priority(level):
+    """Issue the requests of the block, and of tasks it starts, at level."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+@contextmanager
+def default_priority(level):
+    """Like priority(level), unless the caller has set a priority."""
+    if _priority.get() is not None:
+        yield
+        return
+    with priority(level):
+        yield
+
+
+def prioritized(level):
+    """Decorate a coroutine function to issue its requests at level.
+
+    A priority set by the caller with priority() takes precedence.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with default_priority(level):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class TokenBucket:
+    """rate tokens per second, holding at most burst tokens."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def wait(self, now):
+        """Seconds until a token is available."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+
+class RateLimiter:
+    """Global and per-host token buckets, granted to waiters by priority.
+
+    rate and burst apply to all requests, per_host and per_host_burst to the
+    requests to each host. Among waiters the lowest priority value goes
+    first, then the oldest.
+    """
+
+    def __init__(self, rate=10.0, burst=None, per_host=None, per_host_burst=None):
+        self.bucket = TokenBucket(rate, burst)
+        self.per_host = per_host
+        self.per_host_burst = per_host_burst
+        self.hosts = {}
+        self._waiters = []  # (priority, seq, host, future, url)
+        self._seq = itertools.count()
+        self._dispatcher = None
+        self.granted = {INTERACTIVE: 0, NORMAL: 0, BULK: 0}
+
+    def _host_bucket(self, host):
+        if self.per_host is None:
+            return None
+        if host not in self.hosts:
+            self.hosts[host] = TokenBucket(self.per_host, self.per_host_burst)
+        return self.hosts[host]
+
+    def _wait(self, host, now):
+        """Seconds until a request to host may be issued."""
+        wait = self.bucket.wait(now)
+        host_bucket = self._host_bucket(host)
+        if host_bucket is not None:
+            wait = max(wait, host_bucket.wait(now))
+        return wait
+
+    def _grant(self, host, level):
+        self.bucket.take()
+        host_bucket = self._host_bucket(host)
+        if host_bucket is not None:
+            host_bucket.take()
+        self.granted[level] = self.granted.get(level, 0) + 1
+
+    async def acquire(self, url, level=None):
+        """Wait until a request to url is allowed.
+
+        level defaults to the priority of the current context.
+        """
+        level = current_priority() if level is None else level
+        host = urlsplit(url).hostname
+
+        if not self._waiters and self._wait(host, time.monotonic()) == 0:
+            self._grant(host, level)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((level, next(self._seq), host, future, url))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.ensure_future(self._dispatch())
+        await future
+
+    def promote(self, url, level):
+        """Raise the requests to url waiting at a lower priority to level."""
+        for i, (waiting, seq, host, future, waiting_url) in enumerate(self._waiters):
+            if waiting_url == url and level < waiting:
+                self._waiters[i] = (level, seq, host, future, url)
+
+    async def _dispatch(self):
+        """Grant tokens to waiters as they become available."""
+        while self._waiters:
+            now = time.monotonic()
+            wait = None
+            for entry in sorted(self._waiters):
+                level, _, host, future, _ = entry
+                if future.done():  # cancelled
+                    self._waiters.remove(entry)
+                    continue
+                entry_wait = self._wait(host, now)
+                if entry_wait == 0:
+                    self._waiters.remove(entry)
+                    self._grant(host, level)
+                    future.set_result(None)
+                    wait = 0
+                    break
+                # a later waiter for another host may still go first
+                wait = entry_wait if wait is None else min(wait, entry_wait)
+            if wait:
+                await asyncio.sleep(wait)
+            else:
+                await asyncio.sleep(0)
+
+    def stats(self):
+        """Requests granted per priority and requests waiting."""
+        return {"granted": dict(self.granted), "waiting": len(self._waiters)}
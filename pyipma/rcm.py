@@ -4,9 +4,10 @@ from dataclasses import dataclass
 from .api import IPMA_API
 from .auxiliar import AuxiliarParser
 from .dico_codes import DICO
+from .distance import HAVERSINE
 
 
-@dataclass
+@dataclass(slots=True)
 class RCM:
     """Represents fire risk per region DICO."""
 
@@ -29,9 +30,11 @@ class RCM:
 class RCM_day(AuxiliarParser):
     """Represents a Risk of Fire endpoint that retrieves RCM objects."""
 
-    def __init__(self, api: IPMA_API, day: int = 0):
+    key = "dico"
+
+    def __init__(self, api: IPMA_API, day: int = 0, accuracy=HAVERSINE):
         assert day in [0, 1]
-        super().__init__(api)
+        super().__init__(api, accuracy=accuracy)
         self.endpoint = (
             f"http://api.ipma.pt/open-data/forecast/meteorology/rcm/rcm-d{day}.json"
         )
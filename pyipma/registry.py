@@ -0,0 +1,47 @@
+"""Registry of reference data shared by all endpoints of an IPMA_API."""
+import logging
+import time
+
+LOGGER = logging.getLogger(__name__)
+
+REFRESH_INTERVAL = 86400  # seconds
+
+
+class Registry:
+    """Holds one instance of each reference parser (locations, types, ...).
+
+    Instances are handed out to every endpoint so the reference tables are
+    downloaded and parsed once. Every refresh_interval seconds reference
+    parsers are expired, so they reload on next use and keep their data if
+    that fails, and other instances are reset.
+    """
+
+    def __init__(self, api, refresh_interval=REFRESH_INTERVAL):
+        self.api = api
+        self.refresh_interval = refresh_interval
+        self._instances = {}
+
+    def get(self, cls, *args):
+        """Shared instance of cls(api, *args)."""
+        key = (cls, args)
+        now = time.monotonic()
+        entry = self._instances.get(key)
+
+        if entry is None:
+            entry = self._instances[key] = [cls(self.api, *args), now]
+        elif now - entry[1] > self.refresh_interval:
+            LOGGER.debug("Refreshing %s", cls.__name__)
+            getattr(entry[0], "expire", entry[0].reset)()
+            entry[1] = now
+
+        return entry[0]
+
+    def refresh(self):
+        """Reset all instances so they reload on next use.
+
+        Unlike the periodic refresh, reference data is dropped at once.
+        """
+        now = time.monotonic()
+        for entry in self._instances.values():
+            entry[0].reset()
+            entry[1] = now
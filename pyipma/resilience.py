@@ -0,0 +1,109 @@
+"""Retries and circuit breaking of requests to the IPMA API."""
+import logging
+import random
+import time
+from dataclasses import dataclass
+
+from . import IPMAException
+
+LOGGER = logging.getLogger(__name__)
+
+
+class APIError(IPMAException):
+    """The API answered with an unexpected status."""
+
+    def __init__(self, url, status):
+        super().__init__(f"Could not retrieve {url}: HTTP {status}")
+        self.url = url
+        self.status = status
+
+
+class CircuitOpenError(IPMAException):
+    """Requests to a host are suspended after repeated failures."""
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Attempts and jittered exponential backoff (seconds) of a request."""
+
+    attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 4.0
+    statuses: frozenset = frozenset({429, 500, 502, 503, 504})
+
+    def delay(self, attempt):
+        """Delay before retrying after attempt (0 based), with full jitter."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+    def retries(self, status):
+        """Whether a response with status is worth retrying."""
+        return status in self.statuses
+
+
+NO_RETRY = RetryPolicy(attempts=1)
+
+# Retry policy per endpoint, first matching URL fragment wins.
+ENDPOINT_RETRIES = {
+    # refreshed every hour and large, a late copy is better than a slow one
+    "observation/meteorology/stations/observations.json": RetryPolicy(attempts=2),
+}
+DEFAULT_RETRY = RetryPolicy()
+
+
+def retry_policy(url, policies=ENDPOINT_RETRIES, default=DEFAULT_RETRY):
+    """Retry policy of requests to url."""
+    for fragment, policy in policies.items():
+        if fragment in url:
+            return policy
+    return default
+
+
+class CircuitBreaker:
+    """Fails fast after failure_threshold consecutive failures of a host.
+
+    Once open, requests are refused for reset_timeout seconds, then a single
+    trial request is let through: its success closes the breaker and its
+    failure opens it again.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = time.monotonic
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened = 0.0
+
+    def allow(self):
+        """Whether a request may be issued now."""
+        if self.state == self.CLOSED:
+            return True
+        if self.clock() - self.opened < self.reset_timeout:
+            return False
+        # let a trial through, and another if it never reports back
+        self.state = self.HALF_OPEN
+        self.opened = self.clock()
+        return True
+
+    def success(self):
+        """Record a request the host answered."""
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def failure(self):
+        """Record a request the host failed."""
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                LOGGER.warning("Circuit open after %s failures", self.failures)
+            self.state = self.OPEN
+            self.opened = self.clock()
+
+    @property
+    def retry_after(self):
+        """Seconds before a trial request is let through."""
+        if self.state == self.CLOSED:
+            return 0.0
+        return max(0.0, self.opened + self.reset_timeout - self.clock())
@@ -0,0 +1,244 @@
+"""Polling of IPMA products timed by their publication cadence."""
+import asyncio
+import inspect
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+from .forecast import Forecast_days
+from .observation import Observations
+from .ratelimit import BULK, default_priority
+from .sea_forecast import SeaForecasts
+
+LOGGER = logging.getLogger(__name__)
+
+# Expected seconds between publications, until learned.
+DEFAULT_INTERVALS = {
+    "forecast": 12 * 3600,
+    "sea_forecast": 24 * 3600,
+    "observation": 3600,
+}
+MARGIN = 120  # seconds after an expected publication to poll at
+RETRY_INTERVAL = 300  # seconds between polls while an update is overdue
+ALPHA = 0.3  # weight of the latest interval in the learned cadence
+
+
+@dataclass
+class Feed:
+    """A polled product, its newest version and learned cadence."""
+
+    fetch: Callable
+    version: Callable
+    interval: float
+    urls: list = field(default_factory=list)  # revalidated before each poll
+    callbacks: list = field(default_factory=list)
+    pending: list = field(default_factory=list)  # callbacks awaiting data
+    current: Any = None
+    data: Any = None
+    due: float = 0.0
+    unchanged_since: Optional[float] = None  # first poll without an update
+    changes: int = 0
+    polls: int = 0
+
+
+class UpdateScheduler:
+    """Polls forecasts, sea forecasts and observations as they are published.
+
+    Each feed keeps the newest dataUpdate (or observation timestamp) seen and
+    learns the time between publications from them. It is polled MARGIN
+    seconds after the next publication is expected, then every
+    RETRY_INTERVAL seconds until it shows up. Callbacks are called with
+    (key, data) only when the version changes, and feeds shared by several
+    locations are polled once. Polls revalidate the payloads with the API,
+    bypassing fresh cache entries, and are issued at BULK priority.
+    """
+
+    def __init__(self, api, margin=MARGIN, retry_interval=RETRY_INTERVAL):
+        self.api = api
+        self.margin = margin
+        self.retry_interval = retry_interval
+        self.clock = time.monotonic
+        self.feeds = {}
+        self._wakeup = None
+        self._task = None
+
+    def _watch(self, key, fetch, version, callback, urls=()):
+        feed = self.feeds.get(key)
+        if feed is None:
+            feed = self.feeds[key] = Feed(
+                fetch, version, DEFAULT_INTERVALS[key[0]], list(urls)
+            )
+        elif feed.current is not None:
+            # hand the current data to the new callback on the next poll
+            feed.pending.append(callback)
+        feed.callbacks.append(callback)
+        if feed.due > self.clock() and (feed.current is None or feed.pending):
+            feed.due = self.clock()
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return key
+
+    def watch_forecast(self, globalIdLocal, callback, period=24):
+        """Call callback with the forecasts of globalIdLocal as they change."""
+        forecast_days = self.api.registry.get(Forecast_days)
+        return self._watch(
+            ("forecast", globalIdLocal, period),
+            lambda: forecast_days.get(globalIdLocal, period),
+            lambda forecasts: max((f.dataUpdate for f in forecasts), default=None),
+            callback,
+            [forecast_days.endpoint(globalIdLocal)],
+        )
+
+    def watch_sea_forecast(self, globalIdLocal, callback):
+        """Call callback with the sea forecasts of globalIdLocal as they change."""
+        sea_forecasts = self.api.registry.get(SeaForecasts)
+        return self._watch(
+            ("sea_forecast", globalIdLocal),
+            lambda: sea_forecasts.get(globalIdLocal),
+            lambda forecasts: max((f.dataUpdate for f in forecasts), default=None),
+            callback,
+            [sea_forecasts.endpoint.format(day=day) for day in range(3)],
+        )
+
+    def watch_observation(self, idEstacao, callback):
+        """Call callback with the latest observation of idEstacao as it changes."""
+        observations = self.api.registry.get(Observations)
+
+        async def fetch():
+            return (await observations.snapshot()).latest(idEstacao)
+
+        return self._watch(
+            ("observation", idEstacao),
+            fetch,
+            lambda observation: observation and observation.timestamp,
+            callback,
+            [observations.endpoint],
+        )
+
+    def watch(self, location, callback, period=24):
+        """Watch the forecast, observation and sea forecast of a Location."""
+        keys = [
+            self.watch_forecast(location.global_id_local, callback, period),
+            self.watch_observation(location.id_station, callback),
+        ]
+        if location.sea_stations is not None:
+            keys.append(
+                self.watch_sea_forecast(location.sea_station_global_id_local, callback)
+            )
+        return keys
+
+    def unwatch(self, key, callback):
+        """Stop calling callback for key, and polling key once unwatched."""
+        feed = self.feeds.get(key)
+        if feed is not None and callback in feed.callbacks:
+            feed.callbacks.remove(callback)
+            if callback in feed.pending:
+                feed.pending.remove(callback)
+            if not feed.callbacks:
+                del self.feeds[key]
+
+    async def poll(self, key):
+        """Poll key now, returns whether its data changed."""
+        feed = self.feeds.get(key)
+        if feed is None:  # unwatched meanwhile
+            return False
+        now = self.clock()
+        feed.polls += 1
+
+        try:
+            with default_priority(BULK):
+                if self.api is not None and self.api.cache is not None:
+                    await asyncio.gather(
+                        *(self.api.revalidate(url) for url in feed.urls)
+                    )
+                data = await feed.fetch()
+            version = feed.version(data)
+        except Exception as err:
+            LOGGER.warning("Could not poll %s: %s", key, err)
+            feed.due = now + self.retry_interval
+            return False
+
+        if version is None or version == feed.current:
+            if feed.unchanged_since is None:
+                feed.unchanged_since = now
+            feed.due = now + min(self.retry_interval, feed.interval)
+            if feed.pending and feed.current is not None:
+                await self._notify(key, feed.data, feed.pending)
+            feed.pending = []
+            return False
+
+        # published between the last poll without it and now
+        published = now
+        if feed.unchanged_since is not None:
+            published = (feed.unchanged_since + now) / 2
+        if feed.current is not None:
+            elapsed = (version - feed.current).total_seconds()
+            if elapsed > 0:
+                feed.interval += ALPHA * (elapsed - feed.interval)
+
+        feed.current = version
+        feed.data = data
+        feed.changes += 1
+        feed.unchanged_since = None
+        feed.due = max(published + feed.interval + self.margin, now)
+        feed.pending = []
+        LOGGER.debug("%s updated, next poll in %.0fs", key, feed.due - now)
+
+        await self._notify(key, data, feed.callbacks)
+        return True
+
+    async def _notify(self, key, data, callbacks):
+        for callback in list(callbacks):
+            try:
+                result = callback(key, data)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as err:
+                LOGGER.error("Callback for %s failed: %s", key, err)
+
+    async def run(self):
+        """Poll feeds as they are due, until cancelled."""
+        self._wakeup = asyncio.Event()
+        while True:
+            now = self.clock()
+            due = [key for key, feed in self.feeds.items() if feed.due <= now]
+            if due:
+                await asyncio.gather(*(self.poll(key) for key in due))
+                continue
+
+            self._wakeup.clear()
+            timeout = min((f.due for f in self.feeds.values()), default=now + 60)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout - now)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        """Run the scheduler in a background task."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self.run())
+        return self._task
+
+    async def stop(self):
+        """Stop the background task."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self):
+        """Learned interval, polls and changes of every feed."""
+        now = self.clock()
+        return {
+            key: {
+                "interval": feed.interval,
+                "next_poll": max(0.0, feed.due - now),
+                "polls": feed.polls,
+                "changes": feed.changes,
+            }
+            for key, feed in self.feeds.items()
+        }
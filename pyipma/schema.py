@@ -0,0 +1,101 @@
+"""Schema driven decoding of IPMA payload rows into model objects."""
+from dataclasses import dataclass
+from typing import Any, Callable, Union
+
+# Values IPMA uses for "not available", -99 == -99.0 so both are covered.
+MISSING = frozenset({None, "", -99, "-99", "-99.0"})
+
+
+@dataclass(frozen=True)
+class Field:
+    """How to decode one attribute of a model from a payload row.
+
+    source: key (or tuple of keys) of the row, defaults to name.
+    type: callable applied to available values, or the name of a converter
+        given to Decoder.bind().
+    sentinels: values meaning "not available", decoded as default. Fields
+        without sentinels are required and read with row[source].
+    """
+
+    name: str
+    source: Union[str, tuple, None] = None
+    type: Union[Callable, str, None] = None
+    sentinels: frozenset = MISSING
+    default: Any = None
+
+
+class Decoder:
+    """Decoder of payload rows into model objects, compiled once per model.
+
+    args are extra values passed to the decoder next to the row, for
+    attributes that are not part of the row (e.g. an envelope timestamp).
+    """
+
+    def __init__(self, model, fields, args=()):
+        self.model = model
+        self.fields = tuple(fields)
+        self.args = tuple(args)
+        self._factory = self._compile()
+
+    def _compile(self):
+        params = ["_model"]
+        body = [f"    def decode(r{''.join(', ' + arg for arg in self.args)}):"]
+
+        for i, field in enumerate(self.fields):
+            source = field.source or field.name
+            getter = "r.get" if field.sentinels else "r.__getitem__"
+            if isinstance(source, tuple):
+                read = "(" + "".join(f"{getter}({s!r}), " for s in source) + ")"
+            else:
+                read = f"{getter}({source!r})"
+
+            value = "v"
+            if field.type is not None:
+                params.append(f"_type{i}")
+                value = f"_type{i}(v)"
+
+            body.append(f"        v = {read}")
+            if field.sentinels:
+                params += [f"_missing{i}", f"_default{i}"]
+                body.append(
+                    f"        {field.name} = _default{i} if v in _missing{i} else {value}"
+                )
+            else:
+                body.append(f"        {field.name} = {value}")
+
+        kwargs = [f"{name}={name}" for name in self.names]
+        body.append(f"        return _model({', '.join(kwargs)})")
+
+        source = "\n".join(
+            [f"def factory({', '.join(params)}):", *body, "    return decode"]
+        )
+        namespace = {}
+        exec(compile(source, f"<{self.model.__name__} decoder>", "exec"), namespace)
+        return namespace["factory"]
+
+    @property
+    def names(self):
+        """Model attributes set by the decoder."""
+        return [field.name for field in self.fields] + list(self.args)
+
+    def bind(self, **converters):
+        """Decoder function, with named converters resolved."""
+        values = [self.model]
+        for field in self.fields:
+            if isinstance(field.type, str):
+                values.append(converters[field.type])
+            elif field.type is not None:
+                values.append(field.type)
+            if field.sentinels:
+                values += [field.sentinels, field.default]
+        return self._factory(*values)
+
+
+def required(name, source=None, type=None):
+    """Field that must be present in every row."""
+    return Field(name, source, type, sentinels=frozenset())
+
+
+def optional_float(name, source=None):
+    """Numeric field that may be missing or a -99 sentinel."""
+    return Field(name, source, float)
@@ -1,12 +1,21 @@
 """Representation of a Sea Forecast from IPMA."""
+import asyncio
 import datetime
+import logging
+import sys
 from dataclasses import dataclass
 
+from . import IPMAException
 from .api import IPMA_API
 from .auxiliar import Sea_Location, Sea_Locations
+from .ratelimit import BULK, prioritized
+from .schema import Decoder, optional_float, required
+from .timestamps import parse_datetime
 
+LOGGER = logging.getLogger(__name__)
 
-@dataclass
+
+@dataclass(slots=True)
 class SeaForecast:
     """Represents a Sea Forecast."""
 
@@ -78,64 +87,114 @@ class SeaForecast:
         )
 
 
+SEA_FORECAST_DECODER = Decoder(
+    SeaForecast,
+    [
+        optional_float("wavePeriodMin"),
+        required("location", "globalIdLocal", "location"),
+        optional_float("totalSeaMax"),
+        optional_float("waveHighMax"),
+        optional_float("waveHighMin"),
+        optional_float("wavePeriodMax"),
+        optional_float("totalSeaMin"),
+        optional_float("sstMax"),
+        required("predWaveDir", type=sys.intern),
+        optional_float("sstMin"),
+        required(
+            "coordinates",
+            ("longitude", "latitude"),
+            lambda v: (float(v[0]), float(v[1])),
+        ),
+    ],
+    args=("forecastDate", "dataUpdate"),
+)
+
+
 class SeaForecasts:
     def __init__(
         self,
         api: IPMA_API,
     ):
-        """
-        periodo: 1: 3days, 3: 5days, 24: 10days
-        """
+        """Sea forecasts for today and the next 2 days."""
         self.data = None
         self.api = api
+        self.endpoint = "http://api.ipma.pt/open-data/forecast/oceanography/daily/hp-daily-sea-forecast-day{day}.json"
+
+        self.sea_locations = api.registry.get(Sea_Locations)
+        self._updates = None
+        self._locations = None
+        self._by_location = {}
+
+    def reset(self):
+        """Forget parsed forecasts."""
+        self._updates = None
+        self._locations = None
+        self._by_location = {}
+
+    async def _load(self):
+        """Retrieve all days concurrently and index forecasts by location."""
+        raws = await asyncio.gather(
+            *[self.api.retrieve(url=self.endpoint.format(day=day)) for day in range(3)]
+        )
+
+        if any(raw is None for raw in raws):
+            raise IPMAException("Could not retrieve sea forecasts")
+
+        # reloads the sea locations once they expire
+        await self.sea_locations.load()
+        locations = self.sea_locations.by_key
+
+        updates = tuple(raw["dataUpdate"] for raw in raws)
+        if updates == self._updates and locations is self._locations:
+            return self._by_location
+
+        decode = SEA_FORECAST_DECODER.bind(location=lambda v: locations[int(v)])
+
+        by_location = {}
+        for raw in raws:
+            forecast_date = parse_datetime(raw["forecastDate"])
+            dataUpdate = parse_datetime(raw["dataUpdate"])
+            for r in raw["data"]:
+                if int(r["globalIdLocal"]) not in locations:
+                    LOGGER.debug("Unknown sea location %s", r["globalIdLocal"])
+                    continue
+                forecast = decode(r, forecast_date, dataUpdate)
+                by_location.setdefault(forecast.location.globalIdLocal, []).append(
+                    forecast
+                )
+
+        for forecasts in by_location.values():
+            forecasts.sort(key=lambda d: d.forecastDate)
 
-        self.sea_locations = Sea_Locations(api)
+        self._by_location = by_location
+        self._updates = updates
+        self._locations = locations
+        return self._by_location
 
     async def get(self, globalIdLocal):
-        self.data = []
-        for day in range(3):
-            raw = await self.api.retrieve(
-                url=f"http://api.ipma.pt/open-data/forecast/oceanography/daily/hp-daily-sea-forecast-day{day}.json"
-            )
-            forecast_date = datetime.datetime.strptime(raw["forecastDate"], "%Y-%m-%d")
-            dataUpdate = datetime.datetime.strptime(
-                raw["dataUpdate"], "%Y-%m-%dT%H:%M:%S"
-            )
-            self.data += [
-                SeaForecast(
-                    wavePeriodMin=float(r["wavePeriodMin"])
-                    if r.get("wavePeriodMin")
-                    else None,
-                    location=await self.sea_locations.find(int(r["globalIdLocal"])),
-                    totalSeaMax=float(r["totalSeaMax"])
-                    if r.get("totalSeaMax")
-                    else None,
-                    waveHighMax=float(r["waveHighMax"])
-                    if r.get("waveHighMax")
-                    else None,
-                    waveHighMin=float(r["waveHighMin"])
-                    if r.get("waveHighMin")
-                    else None,
-                    wavePeriodMax=float(r["wavePeriodMax"])
-                    if r.get("wavePeriodMax")
-                    else None,
-                    totalSeaMin=float(r["totalSeaMin"])
-                    if r.get("totalSeaMin")
-                    else None,
-                    sstMax=float(r["sstMax"]) if r.get("sstMax") else None,
-                    predWaveDir=r["predWaveDir"],
-                    sstMin=float(r["sstMin"]) if r.get("sstMin") else None,
-                    coordinates=(float(r["longitude"]), float(r["latitude"])),
-                    forecastDate=forecast_date,
-                    dataUpdate=dataUpdate,
-                )
-                for r in raw["data"]
-                if r["globalIdLocal"] == globalIdLocal
-            ]
+        """Sea forecasts for globalIdLocal, sorted by date."""
+        by_location = await self._load()
 
-        self.data = sorted(
-            self.data,
-            key=lambda d: d.forecastDate,
-        )
+        self.data = list(by_location.get(globalIdLocal, []))
 
         return self.data
+
+    @prioritized(BULK)
+    async def get_many(self, globalIdLocals):
+        """Sea forecasts of each of globalIdLocals."""
+        by_location = await self._load()
+
+        return {
+            globalIdLocal: list(by_location.get(globalIdLocal, []))
+            for globalIdLocal in globalIdLocals
+        }
+
+    @prioritized(BULK)
+    async def get_all(self):
+        """Sea forecasts of every sea location."""
+        by_location = await self._load()
+
+        return {
+            globalIdLocal: list(forecasts)
+            for globalIdLocal, forecasts in by_location.items()
+        }
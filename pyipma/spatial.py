@@ -0,0 +1,154 @@
+"""Spatial index for nearest location lookups."""
+import heapq
+import math
+
+from .distance import (
+    ACCURACIES,
+    EARTH_RADIUS_KM,
+    HAVERSINE,
+    SPHERE_ERROR,
+    distances,
+)
+
+
+def to_unit_vector(lat, lon):
+    """Project a (lat, lon) pair in degrees onto the unit sphere."""
+    lat, lon = math.radians(lat), math.radians(lon)
+    cos_lat = math.cos(lat)
+    return (cos_lat * math.cos(lon), cos_lat * math.sin(lon), math.sin(lat))
+
+
+def chord_to_km(chord):
+    """Great circle distance (km) for a chord of the unit sphere."""
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+
+def km_to_chord(km):
+    """Chord of the unit sphere for a great circle distance (km)."""
+    return 2 * math.sin(min(math.pi, km / EARTH_RADIUS_KM) / 2)
+
+
+class SpatialIndex:
+    """KD-tree of items projected onto the unit sphere.
+
+    Items are expected to have a `coordinates` (lat, lon) tuple, which is how
+    IPMA reference data is represented. Queries take the point in that same
+    order, following AuxiliarParser.get_location(lon, lat). Chord length is
+    monotonic with great circle distance, so the ranking is exact on a sphere.
+    With GEODESIC accuracy the candidates are reranked on the WGS-84
+    ellipsoid.
+    """
+
+    def __init__(self, items, accuracy=HAVERSINE):
+        assert accuracy in ACCURACIES, f"accuracy must be one of {ACCURACIES}"
+        self.accuracy = accuracy
+        self.items = list(items)
+        self._points = [to_unit_vector(*item.coordinates) for item in self.items]
+        self._root = self._build(list(range(len(self.items))), 0)
+
+    def __len__(self):
+        return len(self.items)
+
+    def _build(self, idxs, depth):
+        """Build tree nodes as (idx, axis, left, right) tuples."""
+        if not idxs:
+            return None
+        axis = depth % 3
+        idxs.sort(key=lambda i: self._points[i][axis])
+        median = len(idxs) // 2
+        return (
+            idxs[median],
+            axis,
+            self._build(idxs[:median], depth + 1),
+            self._build(idxs[median + 1 :], depth + 1),
+        )
+
+    def _sq_dist(self, idx, target):
+        point = self._points[idx]
+        return (
+            (point[0] - target[0]) ** 2
+            + (point[1] - target[1]) ** 2
+            + (point[2] - target[2]) ** 2
+        )
+
+    def _search(self, target, k):
+        """(squared chord, idx) of the k nearest items, closest first."""
+        heap = []  # max-heap of (-sq_dist, -idx), ties favour the lowest idx
+
+        def visit(node):
+            if node is None:
+                return
+            idx, axis, left, right = node
+            entry = (-self._sq_dist(idx, target), -idx)
+            if len(heap) < k:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+
+            diff = target[axis] - self._points[idx][axis]
+            near, far = (left, right) if diff < 0 else (right, left)
+            visit(near)
+            if len(heap) < k or diff * diff <= -heap[0][0]:
+                visit(far)
+
+        visit(self._root)
+        return sorted((-d, -i) for d, i in heap)
+
+    def _rerank(self, lon, lat, idxs):
+        """(distance, idx) of idxs with the index accuracy, closest first."""
+        coordinates = [self.items[i].coordinates for i in idxs]
+        found = zip(distances((lon, lat), coordinates, self.accuracy), idxs)
+        return sorted(found)
+
+    def nearest(self, lon, lat, k=1):
+        """The k items closest to (lon, lat), closest first."""
+        if k <= 0:
+            return []
+        target = to_unit_vector(lon, lat)
+        found = self._search(target, k)
+
+        if self.accuracy != HAVERSINE and found:
+            # anything closer on the ellipsoid is within the sphere error
+            radius = chord_to_km(math.sqrt(found[-1][0])) * (1 + SPHERE_ERROR)
+            found = self._rerank(lon, lat, self._within(target, radius))[:k]
+
+        return [self.items[i] for _, i in found]
+
+    def within(self, lon, lat, radius_km):
+        """Items no further than radius_km from (lon, lat), closest first."""
+        target = to_unit_vector(lon, lat)
+
+        if self.accuracy == HAVERSINE:
+            return [self.items[i] for i in self._within(target, radius_km)]
+
+        candidates = self._within(target, radius_km * (1 + SPHERE_ERROR))
+        return [
+            self.items[i]
+            for d, i in self._rerank(lon, lat, candidates)
+            if d <= radius_km
+        ]
+
+    def _within(self, target, radius_km):
+        """Indexes of items within radius_km of target, closest first."""
+        limit = km_to_chord(radius_km) ** 2
+        found = []
+
+        def visit(node):
+            if node is None:
+                return
+            idx, axis, left, right = node
+            sq_dist = self._sq_dist(idx, target)
+            if sq_dist <= limit:
+                found.append((sq_dist, idx))
+            diff = target[axis] - self._points[idx][axis]
+            near, far = (left, right) if diff < 0 else (right, left)
+            visit(near)
+            if diff * diff <= limit:
+                visit(far)
+
+        visit(self._root)
+        return [i for _, i in sorted(found)]
+
+    def distance(self, lon, lat, item):
+        """Distance (km) between (lon, lat) and item."""
+        return float(distances((lon, lat), [item.coordinates], self.accuracy)[0])
@@ -0,0 +1,150 @@
+"""Incremental decoding of large IPMA payloads."""
+import codecs
+import json
+
+from . import IPMAException
+
+WHITESPACE = " \t\n\r"
+DELIMITERS = WHITESPACE + ",]}"
+
+
+def _string_end(buf, pos):
+    """Index past the string starting at buf[pos] (a quote), or None."""
+    i = pos + 1
+    while True:
+        i = buf.find('"', i)
+        if i < 0:
+            return None
+        backslashes = 0
+        while buf[i - 1 - backslashes] == "\\":
+            backslashes += 1
+        if backslashes % 2 == 0:
+            return i + 1
+        i += 1
+
+
+def _value_end(buf, pos):
+    """Index past the JSON value starting at buf[pos], or None if incomplete."""
+    char = buf[pos]
+    if char == '"':
+        return _string_end(buf, pos)
+    if char not in "{[":
+        for i in range(pos, len(buf)):
+            if buf[i] in DELIMITERS:
+                return i
+        return None
+
+    depth = 0
+    i = pos
+    while i < len(buf):
+        char = buf[i]
+        if char == '"':
+            i = _string_end(buf, i)
+            if i is None:
+                return None
+            continue
+        if char in "{[":
+            depth += 1
+        elif char in "}]":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return None
+
+
+class ObservationStreamParser:
+    """Push parser for observations.json, {timestamp: {idEstacao: record}}.
+
+    feed() takes chunks of the response body and returns the
+    (timestamp, idEstacao, record) tuples completed so far. Records of
+    stations not in stations are skipped without being decoded, and
+    consumed input is discarded so memory stays bounded by one record.
+    """
+
+    def __init__(self, stations=None):
+        self.stations = None if stations is None else {str(s) for s in stations}
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        self._depth = 0  # 0: before the payload, 1: timestamps, 2: stations, 3: done
+        self._timestamp = None
+
+    def _skip_whitespace(self, pos):
+        while pos < len(self._buf) and self._buf[pos] in WHITESPACE:
+            pos += 1
+        return pos
+
+    def _key(self, pos):
+        """(key, position after the colon), or None if incomplete."""
+        end = _string_end(self._buf, pos)
+        if end is None:
+            return None
+        colon = self._skip_whitespace(end)
+        if colon >= len(self._buf):
+            return None
+        if self._buf[colon] != ":":
+            raise IPMAException(f"Unexpected {self._buf[colon]!r} in observations")
+        return json.loads(self._buf[pos:end]), colon + 1
+
+    def feed(self, chunk):
+        """Decode chunk, returning the records completed by it."""
+        self._buf += self._decoder.decode(chunk)
+        records = []
+        pos = 0
+
+        while True:
+            pos = self._skip_whitespace(pos)
+            if pos >= len(self._buf) or self._depth == 3:
+                break
+            char = self._buf[pos]
+
+            if self._depth == 0:
+                if char != "{":
+                    raise IPMAException("Observations payload is not an object")
+                self._depth = 1
+                pos += 1
+            elif char == ",":
+                pos += 1
+            elif char == "}":
+                self._depth -= 1
+                pos += 1
+                if self._depth == 0:
+                    self._depth = 3
+            elif char != '"':
+                raise IPMAException(f"Unexpected {char!r} in observations")
+            elif self._depth == 1:
+                key = self._key(pos)
+                if key is None:
+                    break
+                self._timestamp, value = key
+                value = self._skip_whitespace(value)
+                if value >= len(self._buf):
+                    break
+                if self._buf[value] != "{":
+                    raise IPMAException(f"Unexpected value for {self._timestamp}")
+                self._depth = 2
+                pos = value + 1
+            else:
+                key = self._key(pos)
+                if key is None:
+                    break
+                estacao, value = key
+                value = self._skip_whitespace(value)
+                if value >= len(self._buf):
+                    break
+                end = _value_end(self._buf, value)
+                if end is None:
+                    break
+                if self.stations is None or estacao in self.stations:
+                    record = json.loads(self._buf[value:end])
+                    if record is not None:
+                        records.append((self._timestamp, estacao, record))
+                pos = end
+
+        self._buf = self._buf[pos:]
+        return records
+
+    def close(self):
+        """Check the whole payload was received."""
+        if self._depth != 3:
+            raise IPMAException("Observations payload ended unexpectedly")
@@ -0,0 +1,19 @@
+"""Decoding of the timestamps used by IPMA."""
+import datetime
+from functools import lru_cache
+
+
+@lru_cache(maxsize=4096)
+def parse_datetime(value):
+    """Decode "%Y-%m-%dT%H:%M:%S", "%Y-%m-%dT%H:%M" or "%Y-%m-%d" timestamps.
+
+    IPMA payloads repeat the same few timestamps (dataUpdate, dataPrev) in
+    every row, so decoded values are memoized.
+    """
+    return datetime.datetime.fromisoformat(value)
+
+
+@lru_cache(maxsize=4096)
+def parse_utc_datetime(value):
+    """Decode a timestamp in UTC into an aware datetime."""
+    return parse_datetime(value).replace(tzinfo=datetime.timezone.utc)
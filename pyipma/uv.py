@@ -1,10 +1,13 @@
 """Representation of UV risk from IPMA."""
 from dataclasses import dataclass
 import datetime
+import sys
 from .api import IPMA_API
+from .schema import Decoder, required
+from .timestamps import parse_datetime
 
 
-@dataclass
+@dataclass(slots=True)
 class UV:
     """Represents UV risk per region DICO."""
 
@@ -40,6 +43,18 @@ class UV:
         return f"{level} - {description}"
 
 
+UV_DECODER = Decoder(
+    UV,
+    [
+        required("idPeriodo", type=int),
+        required("intervaloHora", type=sys.intern),
+        required("data", type=parse_datetime),
+        required("globalIdLocal"),
+        required("iUv", type=float),
+    ],
+).bind()
+
+
 class UV_risks:
     """Represents a Risk of UV endpoint that retrieves UV objects."""
 
@@ -51,17 +66,7 @@ class UV_risks:
         """Retrive UV risk for globalIdLocal, or all."""
         raw = await self.api.retrieve(url=self.endpoint)
 
-        data = [
-            UV(
-                idPeriodo=int(d["idPeriodo"]),
-                intervaloHora=d["intervaloHora"],
-                data=datetime.datetime.strptime(d["data"], "%Y-%m-%d"),
-                globalIdLocal=d["globalIdLocal"],
-                iUv=float(d["iUv"]),
-            )
-            for d in raw
-            if globalIdLocal in [None, d["globalIdLocal"]]
-        ]
+        data = [UV_DECODER(d) for d in raw if globalIdLocal in [None, d["globalIdLocal"]]]
 
         return sorted(
             data,
@@ -1,13 +1,15 @@
 """Representation of Warnings from IPMA."""
+import sys
 from dataclasses import dataclass
 from datetime import datetime
 
 from . import IPMAException
 from .api import IPMA_API
 from .auxiliar import AuxiliarParser
+from .timestamps import parse_datetime
 
 
-@dataclass
+@dataclass(slots=True)
 class Warning:
     """Represents a Warning for a given Area."""
 
@@ -37,11 +39,11 @@ class Warnings:
         return [
             Warning(
                 w["text"],
-                w["awarenessTypeName"],
-                w["idAreaAviso"],
-                datetime.strptime(w["startTime"], "%Y-%m-%dT%H:%M:%S"),
-                w["awarenessLevelID"],
-                datetime.strptime(w["endTime"], "%Y-%m-%dT%H:%M:%S"),
+                sys.intern(w["awarenessTypeName"]),
+                sys.intern(w["idAreaAviso"]),
+                parse_datetime(w["startTime"]),
+                sys.intern(w["awarenessLevelID"]),
+                parse_datetime(w["endTime"]),
             )
             for w in raw
             if w["awarenessLevelID"] != "green"
@@ -16,10 +16,14 @@ setup(
     packages=["pyipma"],
     zip_safe=True,
     platforms="any",
+    python_requires=">=3.10",
     install_requires=[
         "aiohttp",
         "geopy",
     ],
+    extras_require={
+        "speedups": ["numpy", "orjson", "msgspec"],
+    },
     classifiers=[
         "License :: OSI Approved :: MIT License",
         "Intended Audience :: Developers",
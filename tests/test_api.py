@@ -0,0 +1,279 @@
+import asyncio
+import json
+
+import aiohttp
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from pyipma import IPMAException
+from pyipma.api import IPMA_API
+from pyipma.cache import ResponseCache
+from pyipma.ratelimit import BULK, INTERACTIVE, NORMAL, RateLimiter, priority
+from pyipma.resilience import APIError, CircuitBreaker, CircuitOpenError, RetryPolicy
+
+
+@pytest.fixture
+async def uv_server():
+    """Local stand-in for api.ipma.pt serving the UV fixture."""
+    payload = json.load(open("fixtures/uv.json"))
+    hits = []
+
+    async def handler(request):
+        hits.append(request)
+        await asyncio.sleep(0.1)  # keep the request in-flight for a while
+        if request.headers.get("If-None-Match") == '"uv-1"':
+            return web.Response(status=304)
+        return web.json_response(payload, headers={"ETag": '"uv-1"'})
+
+    app = web.Application()
+    app.router.add_get("/uv.json", handler)
+    server = TestServer(app)
+    await server.start_server()
+    server.hits = hits
+    server.payload = payload
+    yield server
+    await server.close()
+
+
+async def test_cache_hit(uv_server):
+    async with aiohttp.ClientSession() as session:
+        api = IPMA_API(session)
+        url = str(uv_server.make_url("/uv.json"))
+
+        first = await api.retrieve(url)
+        second = await api.retrieve(url)
+
+        assert first == uv_server.payload
+        assert second is first
+        assert len(uv_server.hits) == 1
+        assert api.cache.stats()["hits"] == 1
+        assert api.cache.stats()["misses"] == 1
+
+
+async def test_cache_revalidation(uv_server):
+    async with aiohttp.ClientSession() as session:
+        api = IPMA_API(session, cache=ResponseCache(default_ttl=0, ttls={}))
+        url = str(uv_server.make_url("/uv.json"))
+
+        first = await api.retrieve(url)
+        second = await api.retrieve(url)
+
+        assert second is first
+        assert len(uv_server.hits) == 2
+        assert uv_server.hits[1].headers["If-None-Match"] == '"uv-1"'
+        assert api.cache.stats()["revalidations"] == 1
+
+
+async def test_cache_revalidation_evicted(uv_server):
+    async with aiohttp.ClientSession() as session:
+        api = IPMA_API(session, cache=ResponseCache(default_ttl=0, ttls={}))
+        url = str(uv_server.make_url("/uv.json"))
+
+        first = await api.retrieve(url)
+        # evicted while the conditional request is in flight
+        revalidation = asyncio.ensure_future(api.retrieve(url))
+        await asyncio.sleep(0.05)
+        api.cache.invalidate(url)
+
+        assert await revalidation is first
+        assert uv_server.hits[1].headers["If-None-Match"] == '"uv-1"'
+        assert api.cache.get(url).payload is first
+
+
+async def test_cache_eviction(uv_server):
+    async with aiohttp.ClientSession() as session:
+        api = IPMA_API(session, cache=ResponseCache(max_entries=1))
+
+        await api.retrieve(str(uv_server.make_url("/uv.json")))
+        await api.retrieve(str(uv_server.make_url("/uv.json?day=1")))
+
+        assert len(api.cache) == 1
+        assert api.cache.stats()["evictions"] == 1
+
+
+async def test_cache_disabled(uv_server):
+    async with aiohttp.ClientSession() as session:
+        api = IPMA_API(session, cache=False)
+        url = str(uv_server.make_url("/uv.json"))
+
+        await api.retrieve(url)
+        await api.retrieve(url)
+
+        assert api.cache is None
+        assert len(uv_server.hits) == 2
+
+
+async def test_single_flight(uv_server):
+    async with aiohttp.ClientSession() as session:
+        api = IPMA_API(session, cache=False)
+        url = str(uv_server.make_url("/uv.json"))
+
+        results = await asyncio.gather(*[api.retrieve(url) for _ in range(1000)])
+
+        assert len(uv_server.hits) == 1
+        assert all(r is results[0] for r in results)
+        assert results[0] == uv_server.payload
+        assert not api._inflight
+
+
+async def test_single_flight_cancelled_caller(uv_server):
+    async with aiohttp.ClientSession() as session:
+        api = IPMA_API(session, cache=False)
+        url = str(uv_server.make_url("/uv.json"))
+
+        first = asyncio.ensure_future(api.retrieve(url))
+        second = asyncio.ensure_future(api.retrieve(url))
+        await asyncio.sleep(0.01)
+        first.cancel()
+
+        assert await second == uv_server.payload
+        assert len(uv_server.hits) == 1
+
+
+async def test_managed_session(uv_server):
+    url = str(uv_server.make_url("/uv.json"))
+
+    async with IPMA_API.create(cache=False) as api:
+        session = api.websession
+        for _ in range(3):
+            assert await api.retrieve(url) == uv_server.payload
+
+        assert api.connection_stats == {"created": 1, "reused": 2}
+        assert uv_server.hits[0].headers["Accept-Encoding"] == "gzip, deflate"
+
+    assert session.closed
+    assert api.websession is None
+
+
+@pytest.fixture
+async def flaky_server():
+    """Local stand-in for api.ipma.pt answering with queued statuses."""
+    payload = json.load(open("fixtures/uv.json"))
+    hits = []
+    statuses = []
+
+    async def handler(request):
+        hits.append(request)
+        status = statuses.pop(0) if statuses else 200
+        if status != 200:
+            return web.Response(status=status)
+        return web.json_response(payload)
+
+    app = web.Application()
+    app.router.add_get("/uv.json", handler)
+    server = TestServer(app)
+    await server.start_server()
+    server.hits = hits
+    server.statuses = statuses
+    server.payload = payload
+    yield server
+    await server.close()
+
+
+async def test_retry(flaky_server):
+    async with aiohttp.ClientSession() as session:
+        api = IPMA_API(session, retry=RetryPolicy(base_delay=0.01))
+        url = str(flaky_server.make_url("/uv.json"))
+        flaky_server.statuses.extend([503, 500])
+
+        assert await api.retrieve(url) == flaky_server.payload
+        assert len(flaky_server.hits) == 3
+
+        flaky_server.statuses.append(404)
+        with pytest.raises(APIError) as err:
+            await api.retrieve(url + "?day=1")
+        assert err.value.status == 404
+        assert isinstance(err.value, IPMAException)
+        assert len(flaky_server.hits) == 4
+
+
+async def test_circuit_breaker(flaky_server):
+    async with aiohttp.ClientSession() as session:
+        api = IPMA_API(session, retry=False, breaker=lambda: CircuitBreaker(2, 60))
+        url = str(flaky_server.make_url("/uv.json"))
+        flaky_server.statuses.extend([503, 503])
+
+        for _ in range(2):
+            with pytest.raises(APIError):
+                await api.retrieve(url)
+        with pytest.raises(CircuitOpenError):
+            await api.retrieve(url)
+        assert len(flaky_server.hits) == 2
+
+        breaker = api.breakers[flaky_server.host]
+        breaker.opened -= 60
+        assert await api.retrieve(url) == flaky_server.payload
+        assert breaker.state == CircuitBreaker.CLOSED
+
+
+async def test_stale_if_error(flaky_server):
+    async with aiohttp.ClientSession() as session:
+        api = IPMA_API(
+            session,
+            cache=ResponseCache(default_ttl=0, ttls={}),
+            retry=False,
+            stale_if_error=60,
+        )
+        url = str(flaky_server.make_url("/uv.json"))
+
+        first = await api.retrieve(url)
+        flaky_server.statuses.append(503)
+
+        assert await api.retrieve(url) is first
+        assert len(flaky_server.hits) == 2
+
+
+async def test_stale_while_revalidate(flaky_server):
+    async with aiohttp.ClientSession() as session:
+        api = IPMA_API(
+            session,
+            cache=ResponseCache(default_ttl=0, ttls={}),
+            stale_while_revalidate=60,
+        )
+        url = str(flaky_server.make_url("/uv.json"))
+
+        first = await api.retrieve(url)
+        assert await api.retrieve(url) is first
+        assert len(flaky_server.hits) == 1
+
+        await asyncio.sleep(0.1)
+        assert len(flaky_server.hits) == 2
+        assert await api.retrieve(url) is not first
+
+
+async def test_rate_limit(uv_server):
+    async with aiohttp.ClientSession() as session:
+        api = IPMA_API(session, rate_limit=5)
+        url = str(uv_server.make_url("/uv.json"))
+
+        await api.retrieve(url)
+        await api.retrieve(url)  # cached, not rate limited
+
+        assert api.rate_limiter.stats()["granted"][NORMAL] == 1
+
+
+async def test_rate_limit_promotion(uv_server):
+    async with aiohttp.ClientSession() as session:
+        api = IPMA_API(session, rate_limit=RateLimiter(rate=20, burst=1))
+        url = str(uv_server.make_url("/uv.json"))
+        await api.rate_limiter.acquire(url)  # drain the bucket
+
+        with priority(BULK):
+            bulk = [
+                asyncio.ensure_future(api.retrieve(f"{url}?day={day}"))
+                for day in (1, 2, 3)
+            ]
+        await asyncio.sleep(0.01)  # queued behind the drained bucket
+        # joins the queued bulk download of day 3
+        with priority(INTERACTIVE):
+            interactive = await api.retrieve(f"{url}?day=3")
+        await asyncio.gather(*bulk)
+
+        assert interactive == uv_server.payload
+        assert [hit.query.get("day") for hit in uv_server.hits] == ["3", "1", "2"]
+        assert api.rate_limiter.stats()["granted"] == {
+            INTERACTIVE: 1,
+            NORMAL: 1,
+            BULK: 2,
+        }
@@ -1,5 +1,8 @@
+import json
+
 import aiohttp
 import pytest
+from aioresponses import aioresponses
 
 from pyipma.api import IPMA_API
 from pyipma.auxiliar import (
@@ -131,3 +134,24 @@ async def test_precipitation():
 
         assert w.desc() == w.pt
         assert w.en == "--"
+
+
+@pytest.mark.asyncio
+async def test_forecast_location_find():
+    async with aiohttp.ClientSession() as session:
+        with aioresponses() as mocked:
+            mocked.get(
+                "http://api.ipma.pt/public-data/forecast/locations.json",
+                status=200,
+                payload=json.load(open("fixtures/locations.json")),
+            )
+            api = IPMA_API(session)
+
+            forecast_locations = Forecast_Locations(api)
+
+            aveiro = await forecast_locations.find(1010500)
+            found = await forecast_locations.find_many([1010100, 1010500])
+
+            assert aveiro.local == "Aveiro"
+            assert [l.local for l in found] == ["Águeda", "Aveiro"]
+            assert forecast_locations.by_key[1010500] is aveiro
@@ -0,0 +1,35 @@
+import json
+
+import pytest
+
+from pyipma.decoders import PayloadDecoder, TypedPayloadDecoder, default_decoder
+
+FORECAST_URL = "http://api.ipma.pt/public-data/forecast/aggregate/1010500.json"
+OBSERVATIONS_URL = (
+    "https://api.ipma.pt/open-data/observation/meteorology/stations/observations.json"
+)
+
+
+def test_payload_decoder():
+    body = open("fixtures/uv.json", "rb").read()
+
+    assert PayloadDecoder(json.loads).decode(body, "uv.json") == json.loads(body)
+    assert default_decoder().decode(body, "uv.json") == json.loads(body)
+
+
+@pytest.mark.parametrize(
+    "fixture, url",
+    [("1010500.json", FORECAST_URL), ("observations.json", OBSERVATIONS_URL)],
+)
+def test_typed_decoder(fixture, url):
+    pytest.importorskip("msgspec")
+    body = open(f"fixtures/{fixture}", "rb").read()
+
+    assert TypedPayloadDecoder().decode(body, url) == json.loads(body)
+
+
+def test_typed_decoder_fallback():
+    pytest.importorskip("msgspec")
+    body = b'[{"idPeriodo": "not a number"}]'
+
+    assert TypedPayloadDecoder().decode(body, FORECAST_URL) == json.loads(body)
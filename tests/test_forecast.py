@@ -43,3 +43,115 @@ async def test_forecast():
             )
             assert aveiro_forecast[0].location.globalIdLocal == 1010500
             assert aveiro_forecast[1].idTipoTempo.desc() == "Céu pouco nublado"
+
+
+@freeze_time("2022-07-28")
+async def test_forecast_get_many():
+    async with aiohttp.ClientSession() as session:
+        with aioresponses() as mocked:
+
+            # frozen time stops retry backoff
+            api = IPMA_API(session, retry=False)
+
+            mocked.get(
+                "http://api.ipma.pt/public-data/forecast/aggregate/1010500.json",
+                status=200,
+                payload=json.load(open("fixtures/1010500.json")),
+            )
+            mocked.get(
+                "http://api.ipma.pt/public-data/forecast/aggregate/1010100.json",
+                status=500,
+            )
+            mocked.get(
+                "https://api.ipma.pt/open-data/weather-type-classe.json",
+                status=200,
+                payload=json.load(open("fixtures/weather-type-classe.json")),
+            )
+            mocked.get(
+                "http://api.ipma.pt/public-data/forecast/locations.json",
+                status=200,
+                payload=json.load(open("fixtures/locations.json")),
+            )
+
+            forecast_days = Forecast_days(api)
+
+            results = {
+                globalIdLocal: forecasts
+                async for globalIdLocal, forecasts in forecast_days.get_many(
+                    [1010500, 1010100], period=24, max_concurrency=1
+                )
+            }
+
+            assert len(results[1010500]) == 10
+            assert results[1010100] == []
+
+
+@freeze_time("2022-07-28")
+async def test_forecast_all_periods_single_fetch():
+    async with aiohttp.ClientSession() as session:
+        with aioresponses() as mocked:
+
+            api = IPMA_API(session)
+
+            # each endpoint mocked once, a second download would fail
+            mocked.get(
+                "http://api.ipma.pt/public-data/forecast/aggregate/1010500.json",
+                status=200,
+                payload=json.load(open("fixtures/1010500.json")),
+            )
+            mocked.get(
+                "https://api.ipma.pt/open-data/weather-type-classe.json",
+                status=200,
+                payload=json.load(open("fixtures/weather-type-classe.json")),
+            )
+            mocked.get(
+                "http://api.ipma.pt/public-data/forecast/locations.json",
+                status=200,
+                payload=json.load(open("fixtures/locations.json")),
+            )
+
+            forecast_days = Forecast_days(api)
+
+            daily = await forecast_days.get(1010500, 24)
+            hourly = await forecast_days.get(1010500, 1)
+            three_hourly = await forecast_days.get(1010500, 3)
+
+            assert len(daily) == 10
+            assert hourly and all(f.idPeriodo == 1 for f in hourly)
+            assert three_hourly and all(f.idPeriodo == 3 for f in three_hourly)
+            assert await forecast_days.get(1010500, 24) == daily
+
+
+@freeze_time("2022-07-28")
+async def test_forecast_parsed_locations_bounded():
+    async with aiohttp.ClientSession() as session:
+        with aioresponses() as mocked:
+
+            api = IPMA_API(session)
+
+            for globalIdLocal in (1010500, 1010501, 1010502):
+                mocked.get(
+                    f"http://api.ipma.pt/public-data/forecast/aggregate/{globalIdLocal}.json",
+                    status=200,
+                    payload=json.load(open("fixtures/1010500.json")),
+                )
+            mocked.get(
+                "https://api.ipma.pt/open-data/weather-type-classe.json",
+                status=200,
+                payload=json.load(open("fixtures/weather-type-classe.json")),
+            )
+            mocked.get(
+                "http://api.ipma.pt/public-data/forecast/locations.json",
+                status=200,
+                payload=json.load(open("fixtures/locations.json")),
+            )
+
+            forecast_days = Forecast_days(api, max_locations=2)
+            assert Forecast_days(IPMA_API(session)).max_locations == api.cache.max_entries
+
+            first = await forecast_days.get(1010500)
+            await forecast_days.get(1010501)
+            assert await forecast_days.get(1010500) == first  # most recently used
+            await forecast_days.get(1010502)
+
+            assert list(forecast_days._by_location) == [1010500, 1010502]
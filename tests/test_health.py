@@ -0,0 +1,69 @@
+from dataclasses import dataclass
+
+from pyipma.health import (
+    FORECAST_AGE,
+    FORECAST_EXPECTED,
+    HALF_LIFE,
+    HealthTracker,
+    completeness,
+    freshness,
+)
+
+
+@dataclass
+class Candidate:
+    id: int
+    coordinates: tuple
+
+
+def test_record_and_recover():
+    tracker = HealthTracker()
+    now = [0.0]
+    tracker.clock = lambda: now[0]
+
+    assert tracker.health("dead") == 1.0
+    tracker.record("dead", success=False)
+    tracker.record("dead", success=False)
+    assert tracker.health("dead") == 0.25
+
+    now[0] += HALF_LIFE
+    assert tracker.health("dead") == 0.625
+
+    tracker.record("stale", freshness=0.0, completeness=0.5)
+    assert tracker.health("stale") == 0.5 * 0.75
+    assert set(tracker.stats()) == {"dead", "stale"}
+
+
+def test_rank():
+    tracker = HealthTracker()
+    near = Candidate(1, (40.64, -8.65))
+    far = Candidate(2, (40.65, -8.63))
+    point = (40.64, -8.65)
+
+    assert tracker.rank(point, [far, near], [2, 1]) == [near, far]
+
+    for _ in range(3):
+        tracker.record(1, success=False)
+
+    assert tracker.rank(point, [near, far], [1, 2]) == [far, near]
+
+
+def test_freshness_completeness():
+    assert freshness(-10, 60) == 1.0
+    assert freshness(60, 60) == 0.5
+    assert freshness(60, 60, expected=60) == 1.0
+    assert completeness(Candidate(None, (0, 0)), ("id", "coordinates")) == 0.5
+
+
+def test_healthy_nearest_stays_first():
+    tracker = HealthTracker()
+    point = (40.64, -8.65)
+    a = Candidate(1, (40.685, -8.65))  # ~5 km
+    b = Candidate(2, (40.703, -8.65))  # ~7 km
+
+    for _ in range(5):
+        # a forecast published 6 hours ago is not stale
+        first = tracker.rank(point, [a, b], [1, 2])[0]
+        assert first is a
+        age = 6 * 3600
+        tracker.record(1, freshness=freshness(age, FORECAST_AGE, FORECAST_EXPECTED))
@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from pyipma import IPMAException
+from pyipma.hedging import hedge
+
+
+def candidate(result, delay=0.0, log=None):
+    async def call():
+        if log is not None:
+            log.append(result)
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            log.append(f"cancelled {result}")
+            raise
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    return call
+
+
+async def test_sequential():
+    log = []
+    calls = [
+        candidate(ValueError("first"), log=log),
+        candidate("second", log=log),
+        candidate("third", log=log),
+    ]
+
+    assert await hedge(calls) == "second"
+    assert log[1:] == ["second"]
+
+
+async def test_hedged_after_delay():
+    log = []
+    calls = [candidate("slow", 1.0, log), candidate("fast", 0.0, log)]
+
+    assert await hedge(calls, delay=0.05) == "fast"
+    await asyncio.sleep(0)
+    assert log == ["slow", "fast", "cancelled slow"]
+
+
+async def test_invalid_results():
+    calls = [candidate([]), candidate([1])]
+
+    assert await hedge(calls, valid=bool) == [1]
+
+
+async def test_all_fail():
+    with pytest.raises(IPMAException) as err:
+        await hedge([candidate(ValueError("a")), candidate(ValueError("b"))], 0.01)
+
+    assert str(err.value.__cause__) == "b"
+
+
+async def test_deadline():
+    log = []
+    calls = [candidate("slow", 1.0, log), candidate("slower", 1.0, log)]
+
+    with pytest.raises(IPMAException):
+        await hedge(calls, delay=0.01, deadline=0.05)
+    await asyncio.sleep(0)
+    assert sorted(log[2:]) == ["cancelled slow", "cancelled slower"]
@@ -1,12 +1,17 @@
 import json
 
 import aiohttp
+import pytest
 from aioresponses import aioresponses
 from freezegun import freeze_time
 from datetime import datetime
+from geopy import distance
 
 from pyipma.api import IPMA_API
-from pyipma.location import Location
+from pyipma.auxiliar import Forecast_Location, Forecast_Locations, Sea_Location
+from pyipma.distance import GEODESIC, HAVERSINE
+from pyipma.health import HealthTracker
+from pyipma.location import Location, NearbyCache
 from pyipma.rcm import RCM
 from pyipma.uv import UV
 
@@ -18,7 +23,8 @@ def dump_json(data):
 @freeze_time("2022-07-28")
 async def test_location():
     async with aiohttp.ClientSession() as session:
-        api = IPMA_API(session)
+        # frozen time stops retry backoff
+        api = IPMA_API(session, retry=False)
 
         location = await Location.get(api, 40.6517, -8.6573)
         print("Forecast for {}".format(location.name))
@@ -87,3 +93,274 @@ async def test_location():
                 globalIdLocal=1010500,
                 iUv=5.9,
             )
+
+
+STATIONS = [
+    {
+        "geometry": {"type": "Point", "coordinates": [-8.6589, 40.6335]},
+        "type": "Feature",
+        "properties": {
+            "idEstacao": 1210702,
+            "localEstacao": "Aveiro (Universidade)",
+        },
+    },
+    {
+        "geometry": {"type": "Point", "coordinates": [-9.1497, 38.7660]},
+        "type": "Feature",
+        "properties": {
+            "idEstacao": 1200579,
+            "localEstacao": "Lisboa (Geofísico)",
+        },
+    },
+]
+
+
+async def test_location_memo():
+    async with aiohttp.ClientSession() as session:
+        with aioresponses() as mocked:
+            api = IPMA_API(session)
+            mocked.get(
+                "http://api.ipma.pt/public-data/forecast/locations.json",
+                status=200,
+                payload=json.load(open("fixtures/locations.json")),
+            )
+            mocked.get(
+                "https://api.ipma.pt/open-data/observation/meteorology/stations/stations.json",
+                status=200,
+                payload=STATIONS,
+            )
+
+            first = await Location.get(api, 40.6517, -8.6573)
+            nearby = await Location.get(api, 40.6519, -8.6571)
+            lisbon = await Location.get(api, 38.7223, -9.1393)
+            uncached = await Location.get(api, 40.6517, -8.6573, memo=False)
+
+            assert first.name == nearby.name == uncached.name == "Aveiro"
+            assert nearby.forecast_locations is first.forecast_locations
+            assert uncached.forecast_locations is not first.forecast_locations
+            assert lisbon.station == "Lisboa (Geofísico)"
+            assert nearby.coordinates == (40.6519, -8.6571)
+
+            stats = api.registry.get(NearbyCache).stats()
+            assert stats["hits"] == 1
+            assert stats["misses"] == 2
+            assert stats["entries"] == 2
+
+            api.registry.refresh()
+            assert len(api.registry.get(NearbyCache)) == 0
+
+
+async def test_location_geodesic():
+    async with aiohttp.ClientSession() as session:
+        with aioresponses() as mocked:
+            api = IPMA_API(session)
+            mocked.get(
+                "http://api.ipma.pt/public-data/forecast/locations.json",
+                status=200,
+                payload=json.load(open("fixtures/locations.json")),
+                repeat=True,
+            )
+            mocked.get(
+                "https://api.ipma.pt/open-data/observation/meteorology/stations/stations.json",
+                status=200,
+                payload=STATIONS,
+                repeat=True,
+            )
+
+            locations = Forecast_Locations(api, accuracy=GEODESIC)
+            near = await locations.nearest(40.6517, -8.6573, 5)
+            assert near[0].local == "Aveiro"
+            assert near == sorted(
+                await locations.get(None, None),
+                key=lambda d: distance.distance((40.6517, -8.6573), d.coordinates).km,
+            )[:5]
+
+            location = await Location.get(api, 40.6517, -8.6573, accuracy=GEODESIC)
+            assert location.name == "Aveiro"
+            assert location.accuracy == GEODESIC
+            parser = api.registry.get(Forecast_Locations, GEODESIC)
+            assert parser.accuracy == GEODESIC
+            assert parser.index.accuracy == GEODESIC
+
+            # memoized apart from HAVERSINE lookups
+            await Location.get(api, 40.6517, -8.6573)
+            assert api.registry.get(NearbyCache).stats()["misses"] == 2
+            assert api.registry.get(Forecast_Locations).accuracy == HAVERSINE
+
+
+@freeze_time("2022-07-28")
+async def test_location_snapshot():
+    async with aiohttp.ClientSession() as session:
+        with aioresponses() as mocked:
+            # frozen time stops retry backoff
+            api = IPMA_API(session, retry=False)
+            for url, fixture in [
+                ("http://api.ipma.pt/public-data/forecast/locations.json", "locations"),
+                (
+                    "https://api.ipma.pt/open-data/observation/meteorology/stations/observations.json",
+                    "observations",
+                ),
+                (
+                    "http://api.ipma.pt/public-data/forecast/aggregate/1010500.json",
+                    "1010500",
+                ),
+                (
+                    "https://api.ipma.pt/open-data/weather-type-classe.json",
+                    "weather-type-classe",
+                ),
+                (
+                    "https://api.ipma.pt/open-data/distrits-islands.json",
+                    "distrits-islands",
+                ),
+                (
+                    "http://api.ipma.pt/open-data/forecast/meteorology/rcm/rcm-d0.json",
+                    "rcm-d0",
+                ),
+                (
+                    "https://api.ipma.pt/open-data/forecast/meteorology/uv/uv.json",
+                    "uv",
+                ),
+            ]:
+                mocked.get(
+                    url, status=200, payload=json.load(open(f"fixtures/{fixture}.json"))
+                )
+            mocked.get(
+                "https://api.ipma.pt/open-data/observation/meteorology/stations/stations.json",
+                status=200,
+                payload=STATIONS,
+            )
+            mocked.get(
+                "https://api.ipma.pt/open-data/forecast/warnings/warnings_www.json",
+                status=500,
+            )
+
+            location = await Location.get(api, 40.6517, -8.6573)
+            snapshot = await location.snapshot(api)
+
+            assert snapshot.forecast[0].temperature == 19.5
+            assert snapshot.observation.temperature == 18.7
+            assert snapshot.fire_risk.dico == "0105"
+            assert snapshot.uv_risk is not None
+            assert snapshot.sea_forecast == []
+            assert snapshot.warnings is None
+            assert list(snapshot.errors) == ["warnings"]
+            assert location.districts[0].local == "Aveiro"
+
+
+@freeze_time("2022-07-28")
+async def test_location_observation_health():
+    # a station next to the point that never reports
+    silent = {
+        "geometry": {"type": "Point", "coordinates": [-8.6573, 40.6517]},
+        "type": "Feature",
+        "properties": {"idEstacao": 1, "localEstacao": "Silent"},
+    }
+    async with aiohttp.ClientSession() as session:
+        with aioresponses() as mocked:
+            api = IPMA_API(session)
+            mocked.get(
+                "http://api.ipma.pt/public-data/forecast/locations.json",
+                status=200,
+                payload=json.load(open("fixtures/locations.json")),
+            )
+            mocked.get(
+                "https://api.ipma.pt/open-data/observation/meteorology/stations/stations.json",
+                status=200,
+                payload=[silent] + STATIONS,
+            )
+            mocked.get(
+                "https://api.ipma.pt/open-data/observation/meteorology/stations/observations.json",
+                status=200,
+                payload=json.load(open("fixtures/observations.json")),
+            )
+
+            location = await Location.get(api, 40.6517, -8.6573)
+            assert location.station == "Silent"
+
+            tracker = api.registry.get(HealthTracker)
+            for _ in range(2):
+                assert (await location.observation(api)).idEstacao == 1210702
+
+            # tried once, then ranked after the next station
+            assert tracker.health(("station", 1)) == pytest.approx(0.5)
+            assert tracker.health(("station", 1210702)) > 0.5
+            ranked = tracker.rank(
+                location.coordinates,
+                location.observation_stations,
+                [("station", s.idEstacao) for s in location.observation_stations],
+            )
+            assert ranked[0].idEstacao == 1210702
+
+
+@freeze_time("2022-07-28")
+async def test_location_observation_keeps_nearest():
+    # reports every hour, but never pressure
+    nearest = {
+        "geometry": {"type": "Point", "coordinates": [-8.6573, 40.6517]},
+        "type": "Feature",
+        "properties": {"idEstacao": 1210867, "localEstacao": "Nearest"},
+    }
+    async with aiohttp.ClientSession() as session:
+        with aioresponses() as mocked:
+            api = IPMA_API(session)
+            mocked.get(
+                "http://api.ipma.pt/public-data/forecast/locations.json",
+                status=200,
+                payload=json.load(open("fixtures/locations.json")),
+            )
+            mocked.get(
+                "https://api.ipma.pt/open-data/observation/meteorology/stations/stations.json",
+                status=200,
+                payload=[nearest] + STATIONS,
+            )
+            mocked.get(
+                "https://api.ipma.pt/open-data/observation/meteorology/stations/observations.json",
+                status=200,
+                payload=json.load(open("fixtures/observations.json")),
+            )
+
+            location = await Location.get(api, 40.6517, -8.6573)
+            for _ in range(5):
+                observation = await location.observation(api)
+                assert observation.idEstacao == 1210867
+                assert observation.pressao is None
+
+            tracker = api.registry.get(HealthTracker)
+            assert tracker.health(("station", 1210867)) == 1.0
+
+
+async def test_location_sea_forecast_skips_empty():
+    async with aiohttp.ClientSession() as session:
+        with aioresponses() as mocked:
+            api = IPMA_API(session)
+            for day in range(3):
+                mocked.get(
+                    f"http://api.ipma.pt/open-data/forecast/oceanography/daily/hp-daily-sea-forecast-day{day}.json",
+                    status=200,
+                    payload=json.load(open(f"fixtures/hp-daily-sea-forecast-day{day}.json")),
+                )
+            mocked.get(
+                "https://api.ipma.pt/open-data/sea-locations.json",
+                status=200,
+                payload=json.load(open("fixtures/sea-locations.json")),
+            )
+
+            location = Location(
+                -8.87,
+                40.14,
+                [Forecast_Location(1060300, "Figueira da Foz", 1, 6, 3, "CBR", (40.15, -8.86))],
+                [],
+                [
+                    # missing from the day files
+                    Sea_Location(1, "Nowhere", 1, "AVR", 1, (40.15, -8.87)),
+                    Sea_Location(
+                        1060526, "Figueira da Foz, Costa", 1, "CBR", 2, (40.14, -8.88)
+                    ),
+                ],
+            )
+
+            forecasts = await location.sea_forecast(api)
+            assert [f.location.globalIdLocal for f in forecasts] == [1060526] * 3
+
+            location.sea_stations = location.sea_stations[:1]
+            assert await location.sea_forecast(api) == []
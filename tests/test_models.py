@@ -0,0 +1,53 @@
+import dataclasses
+import json
+import tracemalloc
+
+from pyipma.forecast import FORECAST_DECODER, Forecast
+from pyipma.observation import Observation
+from pyipma.rcm import RCM
+from pyipma.sea_forecast import SeaForecast
+from pyipma.uv import UV
+from pyipma.warnings import Warning
+
+MODELS = [Forecast, Observation, SeaForecast, UV, Warning, RCM]
+
+
+def unslotted(model):
+    """Plain dataclass with the same fields as model."""
+    return dataclasses.make_dataclass(
+        f"Plain{model.__name__}",
+        [(f.name, f.type) for f in dataclasses.fields(model)],
+    )
+
+
+def bytes_per_object(model, n=2000):
+    args = [float(i) for i in range(len(dataclasses.fields(model)))]
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    objects = [model(*args) for _ in range(n)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del objects
+    return size / n
+
+
+def test_models_are_slotted():
+    for model in MODELS:
+        assert not hasattr(model(*[None] * len(dataclasses.fields(model))), "__dict__")
+
+        slotted = bytes_per_object(model)
+        plain = bytes_per_object(unslotted(model))
+        print(f"{model.__name__}: {plain:.0f} -> {slotted:.0f} bytes per object")
+
+        assert slotted < plain
+
+
+def test_forecast_strings_interned():
+    rows = json.load(open("fixtures/1010500.json"))
+    decode = FORECAST_DECODER.bind(weather_type=int, location=int)
+
+    first, second = [decode(json.loads(json.dumps(rows[0]))) for _ in range(2)]
+
+    assert first.ddVento is second.ddVento
+    assert first.intervaloHora is second.intervaloHora
@@ -6,6 +6,8 @@ import pytest
 from aioresponses import aioresponses
 
 from pyipma.api import IPMA_API
+from pyipma.auxiliar import Station
+from pyipma.location import Location
 from pyipma.observation import Observation, Observations
 
 
@@ -29,3 +31,82 @@ async def test_observations():
             assert aveiro_obs[0].idEstacao == 1210702
 
             assert aveiro_obs[0].temperature == 17.7
+
+
+async def test_observation_snapshot():
+    async with aiohttp.ClientSession() as session:
+        api = IPMA_API(session, cache=False)
+
+        with aioresponses() as mocked:
+            mocked.get(
+                "https://api.ipma.pt/open-data/observation/meteorology/stations/observations.json",
+                status=200,
+                payload=json.load(open("fixtures/observations.json")),
+            )
+
+            snapshot = await Observations(api).snapshot()
+
+            assert 1210702 in snapshot
+            assert len(snapshot.get(1210702)) == 24
+            assert snapshot.latest(1210702).timestamp == datetime.datetime(
+                2022, 7, 28, 23, 0
+            )
+            assert snapshot.latest(1) is None
+
+
+async def test_location_observation_fallback():
+    async with aiohttp.ClientSession() as session:
+        api = IPMA_API(session, cache=False)
+
+        with aioresponses() as mocked:
+            # mocked once, every candidate station must share the download
+            mocked.get(
+                "https://api.ipma.pt/open-data/observation/meteorology/stations/observations.json",
+                status=200,
+                payload=json.load(open("fixtures/observations.json")),
+            )
+
+            location = Location(
+                -8.6538,
+                40.6405,
+                [],
+                [
+                    Station(1, "Offline", (40.64, -8.65)),
+                    Station(1210702, "Aveiro (Universidade)", (40.63, -8.65)),
+                ],
+                None,
+            )
+
+            obs = await location.observation(api)
+
+            assert obs.idEstacao == 1210702
+            assert obs.temperature == 18.7
+
+
+async def test_observation_store():
+    pytest.importorskip("numpy")
+
+    async with aiohttp.ClientSession() as session:
+        api = IPMA_API(session)
+
+        with aioresponses() as mocked:
+            mocked.get(
+                "https://api.ipma.pt/open-data/observation/meteorology/stations/observations.json",
+                status=200,
+                payload=json.load(open("fixtures/observations.json")),
+            )
+
+            obs = Observations(api)
+            store = await obs.store()
+            snapshot = await obs.snapshot()
+
+            assert len(store.series(1210702, "temperatura")) == 24
+            assert store.series(1210702, "temperatura")[0] == 17.7
+
+            latest = store.latest_all()
+            assert latest[1210702] == snapshot.latest(1210702)
+            assert set(latest) == set(snapshot.stations)
+
+            with_pressure = store.latest_all(required=("pressao",))
+            assert all(o.pressao is not None for o in with_pressure.values())
+            assert len(with_pressure) < len(latest)
@@ -0,0 +1,182 @@
+import json
+import random
+
+import aiohttp
+from aioresponses import aioresponses
+
+from pyipma.api import IPMA_API
+from pyipma.auxiliar import Districts, Forecast_Locations
+from pyipma.location import Location
+from pyipma.raster import REGIONS, SEARCH, NearestRaster
+from pyipma.rcm import RCM_day
+from pyipma.spatial import SpatialIndex
+
+forecast_locations = Forecast_Locations(None)._data_to_obj_list(
+    json.load(open("fixtures/locations.json"))
+)
+districts = Districts(None)._data_to_obj_list(
+    json.load(open("fixtures/distrits-islands.json"))
+)
+rcms = RCM_day(None)._data_to_obj_list(json.load(open("fixtures/rcm-d0.json")))
+
+LAYERS = {
+    "forecast": [(d.globalIdLocal, d.coordinates) for d in forecast_locations],
+    "districts": [(d.globalIdLocal, d.coordinates) for d in districts],
+    "dico": [(d.dico, d.coordinates) for d in rcms],
+}
+raster = NearestRaster.build(LAYERS, resolution=0.1)
+
+
+def test_raster_matches_index():
+    rnd = random.Random(3)
+    indexes = {
+        "forecast": (SpatialIndex(forecast_locations), "globalIdLocal"),
+        "districts": (SpatialIndex(districts), "globalIdLocal"),
+        "dico": (SpatialIndex(rcms), "dico"),
+    }
+    resolved = 0
+
+    for _ in range(300):
+        lat0, lat1, lon0, lon1 = rnd.choice(list(REGIONS.values()))
+        point = (rnd.uniform(lat0, lat1), rnd.uniform(lon0, lon1))
+
+        for layer, (index, key) in indexes.items():
+            ids = raster.nearest(layer, *point)
+            if ids is not None:
+                resolved += 1
+                assert ids[0] == getattr(index.nearest(*point)[0], key)
+
+    assert resolved > 0.9 * 300 * len(indexes)
+
+
+def test_raster_outside():
+    assert raster.nearest("forecast", 0.0, 0.0) is None
+    assert raster.nearest("forecast", 45.0, -8.0) is None
+
+
+def test_raster_save_load(tmp_path):
+    path = tmp_path / "portugal.raster"
+    raster.save(path)
+    loaded = NearestRaster.load(path)
+
+    assert loaded.regions == raster.regions
+    assert loaded.layers == raster.layers
+    assert loaded.cells == raster.cells
+    assert loaded.nearest("dico", 40.6413, -8.6535) == raster.nearest(
+        "dico", 40.6413, -8.6535
+    )
+    assert any(SEARCH not in flags for flags, _ in loaded.cells.values())
+
+
+STATIONS = [
+    {
+        "geometry": {"type": "Point", "coordinates": [-8.6589, 40.6335]},
+        "type": "Feature",
+        "properties": {
+            "idEstacao": 1210702,
+            "localEstacao": "Aveiro (Universidade)",
+        },
+    },
+    {
+        "geometry": {"type": "Point", "coordinates": [-9.1497, 38.7660]},
+        "type": "Feature",
+        "properties": {
+            "idEstacao": 1200579,
+            "localEstacao": "Lisboa (Geofísico)",
+        },
+    },
+]
+
+
+async def test_location_with_partial_raster():
+    forecast_only = NearestRaster.build(
+        {"forecast": LAYERS["forecast"]}, resolution=0.1
+    )
+    assert forecast_only.nearest("stations", 40.6517, -8.6573) is None
+
+    async with aiohttp.ClientSession() as session:
+        with aioresponses() as mocked:
+            api = IPMA_API(session)
+            mocked.get(
+                "http://api.ipma.pt/public-data/forecast/locations.json",
+                status=200,
+                payload=json.load(open("fixtures/locations.json")),
+            )
+            mocked.get(
+                "https://api.ipma.pt/open-data/observation/meteorology/stations/stations.json",
+                status=200,
+                payload=STATIONS,
+            )
+
+            location = await Location.get(
+                api, 40.6517, -8.6573, raster=forecast_only
+            )
+
+            assert location.name == "Aveiro"
+            assert location.id_station == 1210702
+
+
+async def test_location_with_raster():
+    layers = dict(
+        LAYERS,
+        stations=[(1210702, (40.6335, -8.6589)), (1200579, (38.7660, -9.1497))],
+    )
+    with_stations = NearestRaster.build(layers, resolution=0.1)
+
+    async with aiohttp.ClientSession() as session:
+        with aioresponses() as mocked:
+            api = IPMA_API(session)
+            mocked.get(
+                "http://api.ipma.pt/public-data/forecast/locations.json",
+                status=200,
+                payload=json.load(open("fixtures/locations.json")),
+            )
+            mocked.get(
+                "https://api.ipma.pt/open-data/observation/meteorology/stations/stations.json",
+                status=200,
+                payload=STATIONS,
+            )
+            mocked.get(
+                "http://api.ipma.pt/open-data/forecast/meteorology/rcm/rcm-d0.json",
+                status=200,
+                payload=json.load(open("fixtures/rcm-d0.json")),
+            )
+
+            location = await Location.get(api, 40.6517, -8.6573, raster=with_stations)
+
+            assert location.name == "Aveiro"
+            assert location.id_station == 1210702
+            assert (await location.fire_risk(api)).dico == "0105"
+
+
+async def test_location_with_stale_raster():
+    # ranks a station that is no longer in the reference data first
+    layers = dict(
+        LAYERS,
+        stations=[(1210999, (40.6517, -8.6573)), (1200579, (38.7660, -9.1497))],
+    )
+    stale = NearestRaster.build(layers, resolution=0.1)
+    assert stale.nearest("stations", 40.6517, -8.6573)[0] == 1210999
+
+    async with aiohttp.ClientSession() as session:
+        with aioresponses() as mocked:
+            api = IPMA_API(session)
+            mocked.get(
+                "http://api.ipma.pt/public-data/forecast/locations.json",
+                status=200,
+                payload=json.load(open("fixtures/locations.json")),
+            )
+            mocked.get(
+                "https://api.ipma.pt/open-data/observation/meteorology/stations/stations.json",
+                status=200,
+                payload=STATIONS,
+            )
+
+            location = await Location.get(api, 40.6517, -8.6573, raster=stale)
+
+            assert location.name == "Aveiro"
+            assert location.id_station == 1210702
+            assert [s.idEstacao for s in location.observation_stations] == [
+                1210702,
+                1200579,
+            ]
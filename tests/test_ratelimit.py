@@ -0,0 +1,77 @@
+import asyncio
+import time
+
+from pyipma.ratelimit import (
+    BULK,
+    INTERACTIVE,
+    NORMAL,
+    RateLimiter,
+    current_priority,
+    prioritized,
+    priority,
+)
+
+A = "https://api.ipma.pt/open-data/uv.json"
+B = "https://www.ipma.pt/uv.json"
+
+
+async def test_rate():
+    limiter = RateLimiter(rate=20, burst=1)
+    start = time.monotonic()
+
+    for _ in range(3):
+        await limiter.acquire(A)
+
+    assert time.monotonic() - start >= 0.09
+    assert limiter.stats() == {"granted": {0: 0, 1: 3, 2: 0}, "waiting": 0}
+
+
+async def test_priority_order():
+    limiter = RateLimiter(rate=50, burst=1)
+    await limiter.acquire(A)
+    order = []
+
+    async def request(name, level):
+        await limiter.acquire(A, level)
+        order.append(name)
+
+    bulk = [asyncio.ensure_future(request(f"bulk{i}", BULK)) for i in range(3)]
+    await asyncio.sleep(0)
+    interactive = asyncio.ensure_future(request("interactive", INTERACTIVE))
+    await asyncio.gather(interactive, *bulk)
+
+    assert order == ["interactive", "bulk0", "bulk1", "bulk2"]
+
+
+async def test_per_host():
+    limiter = RateLimiter(rate=100, per_host=1, per_host_burst=1)
+    await limiter.acquire(A)
+
+    blocked = asyncio.ensure_future(limiter.acquire(A))
+    await asyncio.wait_for(limiter.acquire(B), 0.5)
+
+    assert not blocked.done()
+    blocked.cancel()
+
+
+async def test_cancelled_waiter():
+    limiter = RateLimiter(rate=20, burst=1)
+    await limiter.acquire(A)
+
+    cancelled = asyncio.ensure_future(limiter.acquire(A, INTERACTIVE))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+
+    await asyncio.wait_for(limiter.acquire(A), 0.5)
+    assert limiter.stats()["waiting"] == 0
+
+
+async def test_prioritized():
+    @prioritized(INTERACTIVE)
+    async def level():
+        return current_priority()
+
+    assert current_priority() == NORMAL
+    assert await level() == INTERACTIVE
+    with priority(BULK):
+        assert await level() == BULK
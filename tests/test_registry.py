@@ -0,0 +1,135 @@
+import json
+
+import aiohttp
+from aioresponses import aioresponses
+from freezegun import freeze_time
+
+from pyipma.api import IPMA_API
+from pyipma.auxiliar import Forecast_Locations, Weather_Types
+from pyipma.forecast import Forecast_days
+from pyipma.location import Location
+
+
+@freeze_time("2022-07-28")
+async def test_shared_reference_data():
+    async with aiohttp.ClientSession() as session:
+        with aioresponses() as mocked:
+            api = IPMA_API(session, cache=False)
+
+            mocked.get(
+                "http://api.ipma.pt/public-data/forecast/aggregate/1010500.json",
+                status=200,
+                payload=json.load(open("fixtures/1010500.json")),
+                repeat=True,
+            )
+            mocked.get(
+                "https://api.ipma.pt/open-data/weather-type-classe.json",
+                status=200,
+                payload=json.load(open("fixtures/weather-type-classe.json")),
+            )
+            mocked.get(
+                "http://api.ipma.pt/public-data/forecast/locations.json",
+                status=200,
+                payload=json.load(open("fixtures/locations.json")),
+            )
+
+            first = Forecast_days(api)
+            second = Forecast_days(api)
+
+            assert first.weather_type is second.weather_type
+            assert first.forecast_locations is api.registry.get(Forecast_Locations)
+
+            # reference tables are mocked once, a second download would fail
+            assert len(await first.get(1010500)) == 10
+            assert len(await second.get(1010500)) == 10
+
+
+async def test_registry_refresh():
+    async with aiohttp.ClientSession() as session:
+        api = IPMA_API(session)
+
+        weather_types = api.registry.get(Weather_Types)
+        weather_types.data = ["cached"]
+
+        api.registry.refresh()
+
+        assert api.registry.get(Weather_Types) is weather_types
+        assert weather_types.data is None
+
+
+async def test_reference_data_expires():
+    async with aiohttp.ClientSession() as session:
+        with aioresponses() as mocked, freeze_time("2022-07-28") as frozen:
+            api = IPMA_API(session, cache=False)
+
+            mocked.get(
+                "http://api.ipma.pt/public-data/forecast/aggregate/1010500.json",
+                status=200,
+                payload=json.load(open("fixtures/1010500.json")),
+                repeat=True,
+            )
+            mocked.get(
+                "https://api.ipma.pt/open-data/weather-type-classe.json",
+                status=200,
+                payload=json.load(open("fixtures/weather-type-classe.json")),
+                repeat=True,
+            )
+            renamed = json.load(open("fixtures/locations.json"))
+            for location in renamed:
+                location["local"] += " (renamed)"
+            mocked.get(
+                "http://api.ipma.pt/public-data/forecast/locations.json",
+                status=200,
+                payload=json.load(open("fixtures/locations.json")),
+            )
+            mocked.get(
+                "http://api.ipma.pt/public-data/forecast/locations.json",
+                status=200,
+                payload=renamed,
+            )
+
+            # held across refreshes, without going through the registry
+            forecast_days = api.registry.get(Forecast_days)
+            forecasts = await forecast_days.get(1010500)
+            assert forecasts[0].location.local == "Aveiro"
+
+            frozen.tick(api.registry.refresh_interval + 1)
+            forecasts = await forecast_days.get(1010500)
+            assert forecasts[0].location.local == "Aveiro (renamed)"
+
+
+async def test_reference_data_kept_during_outage():
+    async with aiohttp.ClientSession() as session:
+        with aioresponses() as mocked, freeze_time("2022-07-28") as frozen:
+            # frozen time stops retry backoff
+            api = IPMA_API(session, retry=False)
+
+            # mocked once, unreachable once they expire
+            mocked.get(
+                "http://api.ipma.pt/public-data/forecast/locations.json",
+                status=200,
+                payload=json.load(open("fixtures/locations.json")),
+            )
+            mocked.get(
+                "https://api.ipma.pt/open-data/observation/meteorology/stations/stations.json",
+                status=200,
+                payload=[
+                    {
+                        "geometry": {"type": "Point", "coordinates": [-8.6589, 40.6335]},
+                        "type": "Feature",
+                        "properties": {
+                            "idEstacao": 1210702,
+                            "localEstacao": "Aveiro (Universidade)",
+                        },
+                    }
+                ],
+            )
+
+            location = await Location.get(api, 40.6517, -8.6573)
+            assert location.name == "Aveiro"
+
+            frozen.tick(api.registry.refresh_interval + 1)
+            location = await Location.get(api, 40.6517, -8.6573, memo=False)
+            assert location.name == "Aveiro"
+            assert location.id_station == 1210702
+            assert api.registry.get(Forecast_Locations).expired
@@ -0,0 +1,132 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import aiohttp
+from aioresponses import aioresponses
+from freezegun import freeze_time
+
+from pyipma.api import IPMA_API
+from pyipma.scheduler import ALPHA, DEFAULT_INTERVALS, MARGIN, UpdateScheduler
+
+
+def updated_forecast():
+    forecasts = json.load(open("fixtures/1010500.json"))
+    for forecast in forecasts:
+        forecast["dataUpdate"] = "2022-07-28T21:05:50"
+        forecast["tMax"] = "23.1"
+    return forecasts
+
+
+@freeze_time("2022-07-28")
+async def test_watch_forecast():
+    async with aiohttp.ClientSession() as session:
+        with aioresponses() as mocked:
+            api = IPMA_API(session)
+            url = "http://api.ipma.pt/public-data/forecast/aggregate/1010500.json"
+            mocked.get(url, status=200, payload=json.load(open("fixtures/1010500.json")))
+            mocked.get(url, status=200, payload=json.load(open("fixtures/1010500.json")))
+            # published while the cached payload is still fresh
+            mocked.get(url, status=200, payload=updated_forecast())
+            mocked.get(
+                "https://api.ipma.pt/open-data/weather-type-classe.json",
+                status=200,
+                payload=json.load(open("fixtures/weather-type-classe.json")),
+            )
+            mocked.get(
+                "http://api.ipma.pt/public-data/forecast/locations.json",
+                status=200,
+                payload=json.load(open("fixtures/locations.json")),
+            )
+
+            scheduler = UpdateScheduler(api)
+            received = []
+            key = scheduler.watch_forecast(1010500, lambda *args: received.append(args))
+
+            assert await scheduler.poll(key)
+            assert not await scheduler.poll(key)
+            assert await scheduler.poll(key)
+
+            assert len(received) == 2
+            assert received[0][0] == ("forecast", 1010500, 24)
+            assert received[0][1][0].temperature == 19.5
+            assert received[1][1][0].dataUpdate == datetime(2022, 7, 28, 21, 5, 50)
+            assert scheduler.stats()[key]["polls"] == 3
+            assert scheduler.stats()[key]["changes"] == 2
+
+
+async def test_late_subscriber():
+    scheduler = UpdateScheduler(None)
+    now = [0.0]
+    scheduler.clock = lambda: now[0]
+    published = datetime(2022, 7, 28)
+    first, second = [], []
+
+    async def fetch():
+        return published
+
+    key = scheduler._watch(
+        ("forecast", 1), fetch, lambda v: v, lambda *args: first.append(args)
+    )
+    assert await scheduler.poll(key)
+
+    now[0] = 1000.0
+    scheduler._watch(
+        ("forecast", 1), fetch, lambda v: v, lambda *args: second.append(args)
+    )
+    # polled right away, only the new callback gets the unchanged data
+    assert scheduler.feeds[key].due == 1000.0
+    assert not await scheduler.poll(key)
+    assert first == [(key, published)]
+    assert second == [(key, published)]
+
+
+async def test_learns_cadence():
+    scheduler = UpdateScheduler(None)
+    now = [0.0]
+    scheduler.clock = lambda: now[0]
+    published = datetime(2022, 7, 28, 0, 0)
+    versions = [published, published, published + timedelta(hours=6)]
+    received = []
+
+    async def fetch():
+        return versions.pop(0)
+
+    key = scheduler._watch(
+        ("forecast", 1), fetch, lambda v: v, lambda *args: received.append(args)
+    )
+    feed = scheduler.feeds[key]
+    interval = DEFAULT_INTERVALS["forecast"]
+
+    assert await scheduler.poll(key)
+    assert feed.due == interval + MARGIN
+
+    now[0] = 1000.0
+    assert not await scheduler.poll(key)
+    assert feed.due == 1000.0 + scheduler.retry_interval
+
+    now[0] = 2000.0
+    assert await scheduler.poll(key)
+    interval += ALPHA * (6 * 3600 - interval)
+    assert feed.interval == interval
+    # published between the poll without it and this one
+    assert feed.due == 1500.0 + interval + MARGIN
+    assert [v for _, v in received] == [published, published + timedelta(hours=6)]
+
+
+async def test_run():
+    scheduler = UpdateScheduler(None)
+    received = asyncio.Event()
+
+    async def fetch():
+        return datetime(2022, 7, 28)
+
+    async def callback(key, data):
+        received.set()
+
+    scheduler.start()
+    scheduler._watch(("observation", 1), fetch, lambda v: v, callback)
+
+    await asyncio.wait_for(received.wait(), 1)
+    await scheduler.stop()
+    assert scheduler.stats()[("observation", 1)]["polls"] == 1
@@ -0,0 +1,61 @@
+from dataclasses import dataclass
+
+import pytest
+
+from pyipma.observation import OBSERVATION_DECODER
+from pyipma.schema import Decoder, Field, optional_float, required
+
+
+@dataclass
+class Row:
+    value: float
+    name: str
+    kind: str
+    when: int
+
+
+DECODER = Decoder(
+    Row,
+    [
+        optional_float("value", "v"),
+        required("name"),
+        Field("kind", type="kind", default="unknown"),
+    ],
+    args=("when",),
+)
+
+
+def test_decoder_sentinels():
+    decode = DECODER.bind(kind=str.upper)
+
+    assert decode({"v": "1.5", "name": "a", "kind": "x"}, 1) == Row(1.5, "a", "X", 1)
+    assert decode({"v": 0, "name": "a"}, 2) == Row(0.0, "a", "unknown", 2)
+    for missing in (-99, -99.0, "-99", "-99.0", "", None):
+        assert decode({"v": missing, "name": "a"}, 3).value is None
+
+
+def test_decoder_required():
+    decode = DECODER.bind(kind=str.upper)
+
+    with pytest.raises(KeyError):
+        decode({"v": 1}, 1)
+
+
+def test_observation_wind_sentinel():
+    r = {
+        "intensidadeVentoKM": -99.0,
+        "temperatura": 22.2,
+        "radiacao": -99.0,
+        "idDireccVento": 4,
+        "precAcumulada": 0.0,
+        "intensidadeVento": -99.0,
+        "humidade": 47.0,
+        "pressao": 1012.9,
+    }
+
+    obs = OBSERVATION_DECODER(r, None, 1210881)
+
+    assert obs.wind_intensity is None
+    assert obs.wind_intensity_km is None
+    assert obs.accumulated_precipitation == 0.0
+    assert obs.wind_direction == "SE"
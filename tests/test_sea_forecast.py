@@ -1,7 +1,9 @@
 import datetime
+import json
 
 import aiohttp
 import pytest
+from aioresponses import aioresponses
 
 from pyipma.api import IPMA_API
 from pyipma.sea_forecast import SeaForecast, SeaForecasts
@@ -23,3 +25,39 @@ async def test_observations():
             - datetime.timedelta(days=1)
         )  # forecast start from today
         assert aveiro_forecast[0].location.globalIdLocal == 1160926
+
+
+def mock_sea_forecasts(mocked):
+    for day in range(3):
+        mocked.get(
+            f"http://api.ipma.pt/open-data/forecast/oceanography/daily/hp-daily-sea-forecast-day{day}.json",
+            status=200,
+            payload=json.load(open(f"fixtures/hp-daily-sea-forecast-day{day}.json")),
+        )
+    mocked.get(
+        "https://api.ipma.pt/open-data/sea-locations.json",
+        status=200,
+        payload=json.load(open("fixtures/sea-locations.json")),
+    )
+
+
+async def test_sea_forecasts_all_locations():
+    async with aiohttp.ClientSession() as session:
+        with aioresponses() as mocked:
+            mock_sea_forecasts(mocked)
+            api = IPMA_API(session)
+
+            sea_forecasts = SeaForecasts(api)
+
+            figueira = await sea_forecasts.get(1060526)
+            assert [f.forecastDate.day for f in figueira] == [28, 29, 30]
+            assert figueira[0].location.local == "Figueira da Foz, Costa"
+            assert figueira[0].min_swell_high == 1.4
+
+            many = await sea_forecasts.get_many([1160926, 1131226, 1])
+            assert len(many[1160926]) == 3
+            assert many[1] == []
+
+            all_forecasts = await sea_forecasts.get_all()
+            assert set(all_forecasts) == {1160926, 1131226, 1060526}
+            assert all_forecasts[1060526][0] is figueira[0]
@@ -0,0 +1,91 @@
+import json
+import random
+
+import pytest
+from geopy import distance
+
+from pyipma.auxiliar import Forecast_Locations
+from pyipma.distance import GEODESIC, SPHERE_ERROR, haversine, haversine_matrix
+from pyipma.spatial import SpatialIndex
+
+forecast_locations = Forecast_Locations(None)._data_to_obj_list(
+    json.load(open("fixtures/locations.json"))
+)
+
+
+def test_nearest_matches_geodesic():
+    index = SpatialIndex(forecast_locations)
+    rnd = random.Random(1)
+
+    for _ in range(50):
+        point = (rnd.uniform(37.0, 42.0), rnd.uniform(-9.5, -6.5))
+        expected = min(
+            forecast_locations,
+            key=lambda d: distance.distance(point, d.coordinates).km,
+        )
+
+        assert index.nearest(*point)[0] == expected
+
+
+def test_nearest_k():
+    index = SpatialIndex(forecast_locations)
+
+    near = index.nearest(40.6405, -8.6538, 5)
+
+    assert len(near) == 5
+    assert near[0].local == "Aveiro"
+    assert len(index.nearest(40.6405, -8.6538, 1000)) == len(forecast_locations)
+
+
+def test_within():
+    index = SpatialIndex(forecast_locations)
+
+    near = index.within(40.6405, -8.6538, 25)
+
+    assert near[0].local == "Aveiro"
+    assert all(index.distance(40.6405, -8.6538, d) <= 25 for d in near)
+    assert len(near) == sum(
+        index.distance(40.6405, -8.6538, d) <= 25 for d in forecast_locations
+    )
+    assert index.within(40.6405, -8.6538, 0.01) == []
+
+
+def test_geodesic_accuracy():
+    index = SpatialIndex(forecast_locations, accuracy=GEODESIC)
+    rnd = random.Random(2)
+
+    for _ in range(10):
+        point = (rnd.uniform(37.0, 42.0), rnd.uniform(-9.5, -6.5))
+        expected = sorted(
+            forecast_locations,
+            key=lambda d: distance.distance(point, d.coordinates).km,
+        )
+
+        assert index.nearest(*point, 5) == expected[:5]
+        assert index.within(*point, 20) == [
+            d for d in expected if distance.distance(point, d.coordinates).km <= 20
+        ]
+
+
+def test_haversine():
+    coordinates = [d.coordinates for d in forecast_locations]
+    point = (40.6405, -8.6538)
+
+    vectorized = haversine(point, coordinates)
+    geodesic = [distance.distance(point, c).km for c in coordinates]
+
+    assert len(vectorized) == len(coordinates)
+    assert all(
+        abs(h - g) <= max(g * SPHERE_ERROR, 1e-9) for h, g in zip(vectorized, geodesic)
+    )
+    assert list(haversine_matrix([point, point], coordinates)[1]) == list(vectorized)
+
+
+def test_haversine_without_numpy(monkeypatch):
+    coordinates = [d.coordinates for d in forecast_locations]
+    point = (40.6405, -8.6538)
+    vectorized = haversine(point, coordinates)
+
+    monkeypatch.setattr("pyipma.distance.np", None)
+
+    assert haversine(point, coordinates) == pytest.approx(list(vectorized))
@@ -0,0 +1,92 @@
+import json
+
+import aiohttp
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from pyipma import IPMAException
+from pyipma.api import IPMA_API
+from pyipma.observation import Observations
+from pyipma.streaming import ObservationStreamParser
+
+BODY = open("fixtures/observations.json", "rb").read()
+
+
+def expected(stations=None):
+    raw = json.loads(BODY)
+    return [
+        (timestamp, estacao, r)
+        for timestamp in raw
+        for estacao, r in raw[timestamp].items()
+        if r is not None and (stations is None or estacao in stations)
+    ]
+
+
+@pytest.mark.parametrize("chunk_size", [61, 4096, len(BODY)])
+def test_stream_parser_chunks(chunk_size):
+    parser = ObservationStreamParser()
+    records = []
+    for i in range(0, len(BODY), chunk_size):
+        records += parser.feed(BODY[i : i + chunk_size])
+    parser.close()
+
+    assert records == expected()
+
+
+def test_stream_parser_bytewise():
+    body = json.dumps(
+        {
+            "2022-07-28T06:00": {"1": {"a": "}\\\"é", "b": [1, {"c": -99.0}]}, "2": None},
+            "2022-07-28T07:00": {"1": None, "2": {"a": 1}},
+        },
+        ensure_ascii=False,
+    ).encode()
+    parser = ObservationStreamParser()
+    records = []
+    for i in range(len(body)):
+        records += parser.feed(body[i : i + 1])
+    parser.close()
+
+    assert records == [
+        ("2022-07-28T06:00", "1", {"a": "}\\\"é", "b": [1, {"c": -99.0}]}),
+        ("2022-07-28T07:00", "2", {"a": 1}),
+    ]
+
+
+def test_stream_parser_filter():
+    parser = ObservationStreamParser([1210702])
+
+    records = parser.feed(BODY)
+
+    assert len(records) == 24
+    assert records == expected({"1210702"})
+    assert parser._buf == ""
+
+
+def test_stream_parser_truncated():
+    parser = ObservationStreamParser()
+    parser.feed(BODY[: len(BODY) // 2])
+
+    with pytest.raises(IPMAException):
+        parser.close()
+
+
+async def test_observations_streaming():
+    async def handler(request):
+        return web.Response(body=BODY, content_type="application/json")
+
+    app = web.Application()
+    app.router.add_get("/observations.json", handler)
+
+    async with TestServer(app) as server:
+        async with aiohttp.ClientSession() as session:
+            api = IPMA_API(session)
+            obs = Observations(api)
+            obs.endpoint = str(server.make_url("/observations.json"))
+
+            streamed = await obs.get(1210702, streaming=True)
+            parsed = await obs.get(1210702)
+
+            assert len(streamed) == 24
+            assert streamed == parsed
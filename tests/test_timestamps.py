@@ -0,0 +1,21 @@
+import datetime
+
+from pyipma.timestamps import parse_datetime, parse_utc_datetime
+
+
+def test_parse_datetime_formats():
+    for value, fmt in [
+        ("2022-07-28T09:05:50", "%Y-%m-%dT%H:%M:%S"),
+        ("2022-07-28T23:00", "%Y-%m-%dT%H:%M"),
+        ("2022-09-04", "%Y-%m-%d"),
+    ]:
+        assert parse_datetime(value) == datetime.datetime.strptime(value, fmt)
+
+
+def test_parse_utc_datetime():
+    assert parse_utc_datetime("2022-07-28T00:00:00") == datetime.datetime(
+        2022, 7, 28, tzinfo=datetime.timezone.utc
+    )
+    assert parse_utc_datetime("2022-07-28T00:00:00") is parse_utc_datetime(
+        "2022-07-28T00:00:00"
+    )